@@ -0,0 +1,176 @@
+"""
+Helpers shared by the processing stages (natives, images, text) and run_pipeline.
+
+Keeping one copy here stops the stages from drifting apart: every stage builds
+its Gemini client through get_client (same timeout and connection pool), parses
+streamed JSON with the same JsonObjectTracker, and walks inputs and writes its
+cache entries the same way.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+
+try:
+    import orjson
+except ImportError:  # optional speedup; dumps/loads fall back to the stdlib encoder
+    orjson = None
+
+
+@functools.lru_cache(maxsize=4)
+def get_client(api_key: str):
+    """Return the Gemini client for api_key, shared by every stage and worker thread.
+    
+    A single client keeps one pooled HTTP connection set (and TLS session) alive
+    for the whole run instead of each stage opening its own.
+    """
+    http_options = types.HttpOptions(
+        # Milliseconds; allow up to 5 minutes per request so very large
+        # transcripts and workbooks do not trip API deadlines
+        timeout=300_000,
+        client_args={"limits": httpx.Limits(max_keepalive_connections=32, max_connections=64)},
+    )
+    return genai.Client(api_key=api_key.strip(), http_options=http_options)
+
+
+class JsonObjectTracker:
+    """Track brace depth over streamed text to spot the end of the outermost JSON object."""
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, text: str) -> bool:
+        """Consume a chunk of text; return True once the outermost object has closed."""
+        if self.complete:
+            return True
+        for char in text:
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif char == "\\":
+                    self.esc = True
+                elif char == '"':
+                    self.in_str = False
+            elif char == '"':
+                if self.started:
+                    self.in_str = True
+            elif char == "{":
+                self.depth += 1
+                self.started = True
+            elif char == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    return True
+        return False
+
+
+def dumps(obj: Any, indent: bool = True) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; let the stdlib encoder handle it
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def loads(data):
+    """Parse JSON from str or bytes; orjson.JSONDecodeError subclasses json.JSONDecodeError."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def strip_json_fence(text: str) -> str:
+    """Strip surrounding whitespace and a leading ```/```json fence (plus its closing ```)."""
+    t = text.strip()
+    if t.startswith("```"):
+        t = t.split("\n", 1)[1] if "\n" in t else t[3:]
+        t = t.rstrip()
+        if t.endswith("```"):
+            t = t[:-3]
+    return t
+
+
+def hash_file(path, name: str = "blake2b") -> "hashlib._Hash":
+    """Return a hash of the file's contents, read in 64 KiB chunks rather than all at once."""
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, name)
+        h = hashlib.new(name)
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+        return h
+
+
+def store_cache_entry(cache_file: Optional[Path], result: Dict[str, Any]) -> None:
+    """Atomically store a successful result in an on-disk cache (tmp file + os.replace)."""
+    if cache_file is None or "error" in result:
+        return
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        f = open(tmp_file, "wb")
+    except FileNotFoundError:
+        # First entry in this shard; create it only when the write actually needs it
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        f = open(tmp_file, "wb")
+    with f:
+        f.write(dumps(result, indent=False))
+    os.replace(tmp_file, cache_file)
+
+
+# Directories the input walkers never descend into: VCS/tooling folders and this
+# pipeline's own outputs and caches. Hidden directories (".git", ".ocr_cache",
+# ".extraction_cache", ...) are skipped as well.
+PRUNE_DIRS = frozenset({
+    "__pycache__", "node_modules",
+    "output", "natives_analysis", "images_analysis", "text_analysis",
+})
+
+
+def iter_files(root, exts, output_suffix: Optional[str] = None) -> Iterator[Path]:
+    """Yield files under root whose lowercased extension is in exts.
+    
+    Walks with an explicit os.scandir stack: the file type comes from the
+    directory entry, so no extra stat() is issued and a Path is built only
+    for matching files. With output_suffix, files that already have a
+    <stem><output_suffix> sibling are skipped, checked against the same
+    directory listing.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        names: Set[str] = set()
+        matches: List[Tuple[str, str]] = []
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    names.add(entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in PRUNE_DIRS and not entry.name.startswith("."):
+                            stack.append(entry.path)
+                        continue
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext.lower() in exts and entry.is_file():
+                        matches.append((stem, entry.path))
+        except OSError:
+            continue
+        for stem, path in matches:
+            if output_suffix is None or stem + output_suffix not in names:
+                yield Path(path)
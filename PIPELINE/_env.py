@@ -0,0 +1,19 @@
+"""
+Load the pipeline's .env exactly once per process.
+
+Scripts import this module for its side effect (``import _env  # noqa: F401``);
+later imports hit sys.modules, so the file is located and parsed only once.
+Variables already set in the environment are never overridden.
+"""
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# .env normally sits next to the scripts; fall back to the repository root
+ENV_PATH = SCRIPT_DIR / ".env"
+if not ENV_PATH.is_file():
+    ENV_PATH = SCRIPT_DIR.parent / ".env"
+
+load_dotenv(dotenv_path=ENV_PATH, override=False)
@@ -25,15 +25,18 @@ import re
 import sys
 import json
 import argparse
-from typing import List, Dict
+import functools
+from typing import List, Dict, Optional
 
-from dotenv import load_dotenv
-from google import genai
+import _env  # noqa: F401  (loads .env once)
+from _common import get_client
 from google.genai import types
 
 HOUSE_OVERSIGHT_PATTERN = re.compile(r"house[_-]?oversight[_-]?(\d+)", re.IGNORECASE)
+DIGIT_RUN_PATTERN = re.compile(r"\d{4,}")
 
 
+@functools.lru_cache(maxsize=1)
 def current_model() -> str:
     return os.environ.get("GEMINI_MODEL", "gemini-2.5-pro-flash")
 
@@ -123,15 +126,15 @@ def extract_page_text(image_path: str, client) -> str:
         max_output_tokens=4096,
         thinking_config=types.ThinkingConfig(thinking_budget=256),
     )
-    out = ""
+    parts: List[str] = []
     for chunk in client.models.generate_content_stream(
         model=current_model(),
         contents=contents,
         config=cfg,
     ):
         if chunk.text:
-            out += chunk.text
-    return out
+            parts.append(chunk.text)
+    return "".join(parts)
 
 
 def call_llm_grouping(client, task_instructions: str, listing: str) -> str:
@@ -150,22 +153,22 @@ def call_llm_grouping(client, task_instructions: str, listing: str) -> str:
         max_output_tokens=8192,
         thinking_config=types.ThinkingConfig(thinking_budget=512),
     )
-    out = ""
+    parts: List[str] = []
     for chunk in client.models.generate_content_stream(
         model=current_model(),
         contents=contents,
         config=cfg,
     ):
         if chunk.text:
-            out += chunk.text
-    return out.strip()
+            parts.append(chunk.text)
+    return "".join(parts).strip()
 
 
 def extract_house_ids(value: str) -> List[str]:
     matches = HOUSE_OVERSIGHT_PATTERN.findall(value)
     if matches:
         return matches
-    return re.findall(r"\d{4,}", value)
+    return DIGIT_RUN_PATTERN.findall(value)
 
 
 def assemble_letters(groups: dict, items_by_filename: Dict[str, Dict[str, str]], output_dir: str) -> None:
@@ -226,8 +229,7 @@ def assemble_letters(groups: dict, items_by_filename: Dict[str, Dict[str, str]],
             f.write(de_text)
 
 
-def main() -> None:
-    load_dotenv()
+def main(argv: Optional[List[str]] = None, client=None) -> None:
     ap = argparse.ArgumentParser(description="LLM-driven grouping of text pages into letters/stories")
     ap.add_argument("--images-dir", help="Directory with original images (optional)")
     ap.add_argument(
@@ -244,7 +246,7 @@ def main() -> None:
     ap.add_argument("--save-input", action="store_true", help="Save the constructed listing file for audit")
     ap.add_argument("--reuse-json", action="store_true", help="Reuse existing llm_grouping.json in output-dir instead of calling LLM")
     ap.add_argument("--run-ocr", action="store_true", help="Run OCR for missing page text using Gemini 2.5 Pro Flash")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
@@ -254,7 +256,8 @@ def main() -> None:
     if not os.path.isdir(args.text_dir):
         os.makedirs(args.text_dir, exist_ok=True)
 
-    client = genai.Client(api_key=api_key)
+    if client is None:
+        client = get_client(api_key)
 
     # Optionally OCR missing pages from images-dir
     if args.run_ocr and args.images_dir is None:
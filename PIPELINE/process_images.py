@@ -10,17 +10,40 @@ For each image, this module:
 """
 from __future__ import annotations
 
+import io
 import os
+import functools
+import itertools
+import multiprocessing
+import re
 import sys
 import json
+import queue
+import logging
+import asyncio
+import threading
 import argparse
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any
-from dotenv import load_dotenv
+from typing import Dict, Any, List, Optional, Set, Tuple
+import _env  # noqa: F401  (loads .env once)
+from _common import (
+    PRUNE_DIRS, JsonObjectTracker, dumps, get_client, iter_files, loads,
+    hash_file, store_cache_entry, strip_json_fence,
+)
+from PIL import Image, ImageOps
 
-from google import genai
 from google.genai import types
 
+logger = logging.getLogger(__name__)
+
+# Markdown code fence around a JSON payload (```json ... ``` or bare ``` ... ```)
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Document ID in a file stem (HOUSE_OVERSIGHT_010488, EFTA00000001, ...) and its digits
+_DOC_ID_RE = re.compile(r'([A-Z]+_?[A-Z]*_?\d+)')
+_DIGITS_RE = re.compile(r'\d+')
+
 
 PROMPT_IMAGE_ANALYSIS = """You are analyzing an image from House Oversight Committee documentation.
 
@@ -114,77 +137,358 @@ CRITICAL RULES:
 """
 
 
-def analyze_image_with_llm(image_path: Path, client) -> Dict[str, Any]:
-    """Analyze image using Gemini vision model."""
+IMAGE_MODEL = "gemini-3-flash-preview"
+
+# Bump whenever PROMPT_IMAGE_ANALYSIS or the result post-processing changes
+PROMPT_VERSION = "1"
+
+PROMPT_IMAGE_BATCH = """The {count} images above are labelled IMAGE 1 to IMAGE {count}.
+Apply the instructions above to EACH image independently. Return a JSON array
+containing exactly {count} objects, one per image and in the same order
+(IMAGE 1 first). Each object must follow the OUTPUT FORMAT above.
+"""
+
+# Uploads are downscaled to fit this box and re-encoded as JPEG at this quality
+PREPROCESS_MAX_DIM = 2048
+PREPROCESS_JPEG_QUALITY = 85
+
+# The prompt never changes at runtime: build its request Part and cache-key bytes once.
+# The key also records what was uploaded, so downscaled and original analyses never mix.
+_PROMPT_IMAGE_PART = types.Part.from_text(text=PROMPT_IMAGE_ANALYSIS)
+_CACHE_KEY_SUFFIX = f"{PROMPT_IMAGE_ANALYSIS}|{IMAGE_MODEL}|{PROMPT_VERSION}".encode("utf-8")
+_PREPROCESS_KEY_SUFFIX = {
+    True: f"|preprocess={PREPROCESS_MAX_DIM}px,q{PREPROCESS_JPEG_QUALITY}".encode("utf-8"),
+    False: b"|preprocess=off",
+}
+# Batched analyses see PROMPT_IMAGE_BATCH and the other images in the request, so
+# they are cached apart from single-image ones
+_BATCH_KEY_SUFFIX = f"|batch|{PROMPT_IMAGE_BATCH}".encode("utf-8")
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    """Write obj as indented UTF-8 JSON, using orjson when it is installed."""
+    path.write_bytes(dumps(obj))
+
+
+def _preprocess(image_path: Path) -> Optional[bytes]:
+    """Return a downscaled JPEG encoding of the image, or None to upload the original.
+    
+    PDFs, multi-page images, unreadable files, and images that would not shrink
+    are left alone. Runs in a worker process, so it must stay module-level.
+    """
+    if image_path.suffix.lower() == ".pdf":
+        return None
+    try:
+        with Image.open(image_path) as img:
+            if getattr(img, "n_frames", 1) > 1:
+                return None
+            # The JPEG re-encode drops EXIF, so bake the Orientation tag into the
+            # pixels first or phone scans reach OCR sideways
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((PREPROCESS_MAX_DIM, PREPROCESS_MAX_DIM))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=PREPROCESS_JPEG_QUALITY, optimize=True)
+        data = buf.getvalue()
+        if len(data) >= image_path.stat().st_size:
+            return None
+        return data
+    except Exception:
+        return None
+
+
+# forkserver is POSIX-only; elsewhere spawn is the safe (and default) start method
+_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class _LazyProcessPool(Executor):
+    """ProcessPoolExecutor that only starts its worker processes on the first submit.
+    
+    Uploads are the only users of the pool, so a run served entirely from the
+    OCR cache never spawns it.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # Started from a worker thread of an already multi-threaded process,
+                    # where fork() can deadlock; forkserver children start clean
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self._max_workers,
+                        mp_context=multiprocessing.get_context(_POOL_START_METHOD),
+                    )
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def _ocr_cache_paths(cache_dir: Path, image_path: Path, preprocess: bool = False) -> Tuple[Path, Path]:
+    """Return the (single-image, batched) cache entries for this image's bytes.
+    
+    Both keys cover the prompt, model and preprocessing; the file is hashed once.
+    """
+    h = hash_file(image_path)
+    h.update(_CACHE_KEY_SUFFIX)
+    h.update(_PREPROCESS_KEY_SUFFIX[preprocess])
+    batch_h = h.copy()
+    batch_h.update(_BATCH_KEY_SUFFIX)
+    single_key, batch_key = h.hexdigest(), batch_h.hexdigest()
+    return (
+        cache_dir / single_key[:2] / f"{single_key}.json",
+        cache_dir / batch_key[:2] / f"{batch_key}.json",
+    )
+
+
+def _apply_image_identity(result: Dict[str, Any], image_path: Path) -> None:
+    """Stamp file name, path and document IDs derived from image_path onto result."""
+    result["file_name"] = image_path.name
+    result["file_path"] = str(image_path.relative_to(image_path.parents[2]))  # Relative to BATCH7
+    
+    # Extract ID from filename (e.g., HOUSE_OVERSIGHT_010488 or EFTA00000001)
+    # Match common patterns: prefix followed by numbers
+    id_match = _DOC_ID_RE.search(image_path.stem)
+    if id_match:
+        result["document_id"] = id_match.group(1)
+        # Keep house_oversight_id for backward compatibility if it matches that pattern
+        if "HOUSE_OVERSIGHT" in id_match.group(1):
+            result["house_oversight_id"] = _DIGITS_RE.search(id_match.group(1)).group()
+
+
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".tif", ".tiff", ".gif", ".bmp", ".pdf"})
+
+
+def _scan_images(directory: Path, output_suffix: Optional[str] = None) -> List[Path]:
+    """Recursively list image files under directory."""
+    return list(iter_files(directory, IMAGE_EXTENSIONS, output_suffix))
+
+
+def _find_image_files(
+    images_dir: Path,
+    max_workers: int = 8,
+    output_suffix: Optional[str] = None,
+) -> List[Path]:
+    """List image files under images_dir, walking each top-level subfolder in its own thread.
+    
+    Batches are laid out as IMAGES/001, IMAGES/002, ...; directory reads and stats
+    release the GIL, so fanning out per subfolder overlaps the filesystem latency.
+    With output_suffix, images whose output already exists are left out.
+    """
+    names: Set[str] = set()
+    top_matches: List[Tuple[str, str]] = []
+    subdirs: List[Path] = []
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            names.add(entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in PRUNE_DIRS and not entry.name.startswith("."):
+                    subdirs.append(Path(entry.path))
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            if ext.lower() in IMAGE_EXTENSIONS and entry.is_file():
+                top_matches.append((stem, entry.path))
+    top_files = [
+        Path(path) for stem, path in top_matches
+        if output_suffix is None or stem + output_suffix not in names
+    ]
+    scan = functools.partial(_scan_images, output_suffix=output_suffix)
+    if len(subdirs) <= 1:
+        return top_files + list(itertools.chain.from_iterable(map(scan, subdirs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return top_files + list(itertools.chain.from_iterable(ex.map(scan, subdirs)))
+
+
+def _read_cached_result(cache_file: Optional[Path], image_path: Path) -> Optional[Dict[str, Any]]:
+    """Return the cached analysis stamped for image_path, or None on a miss."""
+    if cache_file is None:
+        return None
+    # Just try the open: a miss costs the same single failed syscall as exists()
+    try:
+        with open(cache_file, "rb") as f:
+            result = loads(f.read())
+    except (OSError, json.JSONDecodeError):
+        return None
+    _apply_image_identity(result, image_path)
+    result.setdefault("processing_metadata", {})["cache_hit"] = True
+    return result
+
+
+def _image_cache_files(
+    cache_dir: Optional[Path],
+    image_path: Path,
+    preprocess_pool: Optional[Executor] = None,
+) -> Tuple[Optional[Path], Optional[Path]]:
+    """Return the (single-image, batched) OCR cache entries for image_path.
+    
+    Both are None when caching is off or the image is unreadable.
+    """
+    if cache_dir is None:
+        return None, None
+    try:
+        return _ocr_cache_paths(cache_dir, image_path, preprocess_pool is not None)
+    except OSError:
+        return None, None
+
+
+def analyze_image_with_llm(
+    image_path: Path,
+    client,
+    cache_dir: Optional[Path] = None,
+    preprocess_pool: Optional[Executor] = None,
+) -> Dict[str, Any]:
+    """Analyze image using Gemini vision model.
+    
+    Args:
+        image_path: Path to image file
+        client: Gemini client
+        cache_dir: If set, reuse/store results keyed by image bytes, prompt, model and preprocessing
+        preprocess_pool: If set, downscale/recompress the image in this executor before upload
+    """
+    cache_file = _image_cache_files(cache_dir, image_path, preprocess_pool)[0]
+    cached = _read_cached_result(cache_file, image_path)
+    if cached is not None:
+        return cached
+    
+    result = _analyze_image_uncached(image_path, client, preprocess_pool)
+    store_cache_entry(cache_file, result)
+    return result
+
+
+def analyze_image_batch(
+    image_paths: List[Path],
+    client,
+    cache_dir: Optional[Path] = None,
+    preprocess_pool: Optional[Executor] = None,
+) -> List[Dict[str, Any]]:
+    """Analyze several images, sending every cache miss in one Gemini request.
+    
+    Results are returned in the order of image_paths. A single-image cache entry
+    is preferred, then a batched one; fresh results are stored under the entry
+    matching the request that produced them.
+    """
+    cache_files = [_image_cache_files(cache_dir, p, preprocess_pool) for p in image_paths]
+    results: List[Optional[Dict[str, Any]]] = []
+    for (single_file, batch_file), p in zip(cache_files, image_paths):
+        cached = _read_cached_result(single_file, p)
+        if cached is None:
+            cached = _read_cached_result(batch_file, p)
+        results.append(cached)
+    
+    misses = [i for i, result in enumerate(results) if result is None]
+    if len(misses) == 1:
+        i = misses[0]
+        results[i] = _analyze_image_uncached(image_paths[i], client, preprocess_pool)
+        store_cache_entry(cache_files[i][0], results[i])
+    elif misses:
+        fresh, batched = _analyze_image_batch_uncached([image_paths[i] for i in misses], client, preprocess_pool)
+        # The one-by-one fallback produces single-image results; cache them as such
+        entry = 1 if batched else 0
+        for i, result in zip(misses, fresh):
+            results[i] = result
+            store_cache_entry(cache_files[i][entry], result)
+    return results
+
+
+def _image_generate_config(max_output_tokens: int = 16384) -> "types.GenerateContentConfig":
+    """Generation settings shared by single-image and batched requests."""
+    return types.GenerateContentConfig(
+        temperature=0.3,
+        response_mime_type="application/json",
+        max_output_tokens=max_output_tokens,
+        thinking_config=types.ThinkingConfig(thinking_budget=1024),
+    )
+
+
+def _upload_image(image_path: Path, client, preprocess_pool: Optional[Executor] = None):
+    """Upload the image (downscaled JPEG when preprocessing shrinks it) and return the file handle."""
+    upload_bytes = None
+    if preprocess_pool is not None:
+        upload_bytes = preprocess_pool.submit(_preprocess, image_path).result()
+    if upload_bytes is not None:
+        return client.files.upload(
+            file=io.BytesIO(upload_bytes),
+            config=types.UploadFileConfig(mime_type="image/jpeg"),
+        )
+    return client.files.upload(file=str(image_path))
+
+
+def _stamp_metadata(result: Dict[str, Any]) -> None:
+    """Add processing metadata if the model did not return any."""
+    if "processing_metadata" not in result:
+        result["processing_metadata"] = {
+            "processed_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "model": IMAGE_MODEL
+        }
+
+
+def _analyze_image_uncached(
+    image_path: Path,
+    client,
+    preprocess_pool: Optional[Executor] = None,
+) -> Dict[str, Any]:
+    """Upload the image and run the Gemini analysis prompt on it."""
     try:
-        # Upload image file
-        files = [client.files.upload(file=str(image_path))]
+        uploaded = _upload_image(image_path, client, preprocess_pool)
         
         contents = [
             types.Content(
                 role="user",
                 parts=[
                     types.Part.from_uri(
-                        file_uri=files[0].uri,
-                        mime_type=files[0].mime_type,
+                        file_uri=uploaded.uri,
+                        mime_type=uploaded.mime_type,
                     ),
-                    types.Part.from_text(text=PROMPT_IMAGE_ANALYSIS),
+                    _PROMPT_IMAGE_PART,
                 ],
             )
         ]
         
-        cfg = types.GenerateContentConfig(
-            temperature=0.3,
-            response_mime_type="application/json",
-            max_output_tokens=16384,
-            thinking_config=types.ThinkingConfig(thinking_budget=1024),
-        )
-        
-        out = ""
-        for chunk in client.models.generate_content_stream(
-            model="gemini-3-flash-preview",
+        parts: List[str] = []
+        tracker = JsonObjectTracker()
+        stream = client.models.generate_content_stream(
+            model=IMAGE_MODEL,
             contents=contents,
-            config=cfg,
-        ):
-            if chunk.text:
-                out += chunk.text
+            config=_image_generate_config(),
+        )
+        try:
+            for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    # Stop reading once the outermost JSON object has closed
+                    if tracker.feed(chunk.text):
+                        break
+        finally:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+        out = "".join(parts)
         
         # Parse JSON response
         try:
-            result = json.loads(out.strip())
+            # Fenced responses are handled with plain string ops; the regex is only a fallback
+            result = loads(strip_json_fence(out))
             # Ensure file_name is set
-            result["file_name"] = image_path.name
-            result["file_path"] = str(image_path.relative_to(image_path.parents[2]))  # Relative to BATCH7
-            
-            # Extract ID from filename (e.g., HOUSE_OVERSIGHT_010488 or EFTA00000001)
-            import re
-            # Match common patterns: prefix followed by numbers
-            id_match = re.search(r'([A-Z]+_?[A-Z]*_?\d+)', image_path.stem)
-            if id_match:
-                result["document_id"] = id_match.group(1)
-                # Keep house_oversight_id for backward compatibility if it matches that pattern
-                if "HOUSE_OVERSIGHT" in id_match.group(1):
-                    result["house_oversight_id"] = re.search(r'\d+', id_match.group(1)).group()
-            
-            # Add processing metadata if not present
-            if "processing_metadata" not in result:
-                import datetime
-                result["processing_metadata"] = {
-                    "processed_at": datetime.datetime.utcnow().isoformat() + "Z",
-                    "model": "gemini-3-flash-preview"
-                }
-            
+            _apply_image_identity(result, image_path)
+            _stamp_metadata(result)
             return result
         except json.JSONDecodeError as e:
-            print(f"    Warning: LLM response not valid JSON: {e}", file=sys.stderr)
+            logger.warning("    Warning: LLM response for %s not valid JSON: %s", image_path.name, e)
             # Try to extract JSON from markdown code blocks
-            if "```json" in out:
-                json_start = out.find("```json") + 7
-                json_end = out.find("```", json_start)
-                if json_end > json_start:
-                    result = json.loads(out[json_start:json_end].strip())
-                    result["file_name"] = image_path.name
-                    return result
+            fence = _JSON_FENCE_RE.search(out)
+            json_start = out.find("{")
+            # An early stop can leave a preamble before the object
+            if fence or (tracker.complete and json_start > 0):
+                result = loads(fence.group(1) if fence else out[json_start:])
+                result["file_name"] = image_path.name
+                return result
             
             # Fallback: return error structure
             return {
@@ -200,8 +504,100 @@ def analyze_image_with_llm(image_path: Path, client) -> Dict[str, Any]:
         }
 
 
-def process_single_image(image_path: Path, client, skip_existing: bool) -> None:
-    """Process a single image and save JSON output in same folder."""
+def _analyze_image_batch_uncached(
+    image_paths: List[Path],
+    client,
+    preprocess_pool: Optional[Executor] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Upload several images and analyze them with one Gemini request.
+    
+    Returns (results, batched). Falls back to one request per image, with
+    batched False, if the batch call fails or does not return exactly one
+    object per image.
+    """
+    try:
+        with ThreadPoolExecutor(max_workers=len(image_paths)) as ex:
+            uploads = list(ex.map(lambda p: _upload_image(p, client, preprocess_pool), image_paths))
+        
+        request_parts = []
+        for index, (image_path, uploaded) in enumerate(zip(image_paths, uploads), 1):
+            request_parts.append(types.Part.from_text(text=f"IMAGE {index}: {image_path.name}"))
+            request_parts.append(types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type))
+        request_parts.append(_PROMPT_IMAGE_PART)
+        request_parts.append(types.Part.from_text(text=PROMPT_IMAGE_BATCH.format(count=len(image_paths))))
+        
+        # The reply is an array, so the whole stream is read (no early stop on the first object)
+        parts: List[str] = []
+        for chunk in client.models.generate_content_stream(
+            model=IMAGE_MODEL,
+            contents=[types.Content(role="user", parts=request_parts)],
+            config=_image_generate_config(min(16384 * len(image_paths), 65536)),
+        ):
+            if chunk.text:
+                parts.append(chunk.text)
+        out = "".join(parts)
+        
+        results = loads(strip_json_fence(out))
+        if not isinstance(results, list) or len(results) != len(image_paths) or not all(
+            isinstance(r, dict) for r in results
+        ):
+            raise ValueError(f"expected a JSON array of {len(image_paths)} objects")
+    except Exception as e:
+        logger.warning("    Warning: batched analysis failed (%s); retrying images one by one", e)
+        return [_analyze_image_uncached(p, client, preprocess_pool) for p in image_paths], False
+    
+    for image_path, result in zip(image_paths, results):
+        _apply_image_identity(result, image_path)
+        _stamp_metadata(result)
+    return results, True
+
+
+class _JsonWriter:
+    """Write JSON outputs from one background thread fed by a bounded queue.
+    
+    Workers hand off (path, obj) pairs and go straight back to the API, so disk
+    latency (slow on network shares) overlaps with uploads and generation.
+    close() drains the queue and waits for the thread.
+    """
+    
+    def __init__(self, maxsize: int = 64) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[Path, Any]]]" = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+        self._thread.start()
+    
+    def put(self, path: Path, obj: Any) -> None:
+        self._queue.put((path, obj))
+    
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, obj = item
+            try:
+                _write_json(path, obj)
+                print(f"    Saved: {path.name}")
+            except Exception as e:
+                logger.error("    ERROR writing %s: %s", path.name, e)
+
+
+def process_single_image(
+    image_path: Path,
+    client,
+    skip_existing: bool,
+    cache_dir: Optional[Path] = None,
+    preprocess_pool: Optional[Executor] = None,
+    writer: Optional[_JsonWriter] = None,
+) -> None:
+    """Process a single image and save JSON output in same folder.
+    
+    With `writer`, the JSON is queued for the background writer instead of
+    being written before this returns.
+    """
     output_file = image_path.parent / f"{image_path.stem}.json"
     
     if skip_existing and output_file.exists():
@@ -212,41 +608,128 @@ def process_single_image(image_path: Path, client, skip_existing: bool) -> None:
     
     try:
         # Analyze image with LLM
-        analysis = analyze_image_with_llm(image_path, client)
+        analysis = analyze_image_with_llm(image_path, client, cache_dir, preprocess_pool)
         
         # Save JSON result in same folder as image
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(analysis, f, ensure_ascii=False, indent=2)
-        
-        print(f"    Saved: {output_file.name}")
+        if writer is not None:
+            writer.put(output_file, analysis)
+        else:
+            _write_json(output_file, analysis)
+            print(f"    Saved: {output_file.name}")
         
     except Exception as e:
-        print(f"    ERROR processing {image_path.name}: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("    ERROR processing %s: %s", image_path.name, e)
 
 
-def process_images(images_dir: Path, output_dir: Path, skip_existing: bool = False, limit: int | None = None) -> None:
-    """Process all images in IMAGES directory recursively."""
-    output_dir.mkdir(parents=True, exist_ok=True)
+def process_image_batch(
+    image_paths: List[Path],
+    client,
+    cache_dir: Optional[Path] = None,
+    preprocess_pool: Optional[Executor] = None,
+    writer: Optional[_JsonWriter] = None,
+) -> None:
+    """Analyze a group of images with one Gemini request and save each JSON next to its image."""
+    print(f"  Processing batch: {', '.join(p.name for p in image_paths)}")
     
-    # Get API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set", file=sys.stderr)
-        sys.exit(1)
+    try:
+        analyses = analyze_image_batch(image_paths, client, cache_dir, preprocess_pool)
+    except Exception as e:
+        logger.exception("    ERROR processing batch starting at %s: %s", image_paths[0].name, e)
+        return
     
-    client = genai.Client(api_key=api_key)
+    for image_path, analysis in zip(image_paths, analyses):
+        output_file = image_path.parent / f"{image_path.stem}.json"
+        if writer is not None:
+            writer.put(output_file, analysis)
+        else:
+            _write_json(output_file, analysis)
+            print(f"    Saved: {output_file.name}")
+
+
+async def _process_images_concurrently(
+    image_files: List[Path],
+    images_dir: Path,
+    client,
+    skip_existing: bool,
+    concurrency: int,
+    cache_dir: Optional[Path] = None,
+    preprocess_pool: Optional[Executor] = None,
+    writer: Optional[_JsonWriter] = None,
+    batch_size: int = 1,
+) -> None:
+    """Run process_single_image for every file with at most `concurrency` in flight.
+
+    The work is network-bound on Gemini, so the blocking calls run in worker
+    threads; each JSON is written (or queued on `writer`) as soon as its image finishes.
+    With batch_size > 1, consecutive images share one request via process_image_batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(image_files)
     
-    # Find all image files recursively
-    image_extensions = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".gif", ".bmp", ".pdf"}
-    image_files = [
-        f for f in images_dir.rglob("*")
-        if f.suffix.lower() in image_extensions and f.is_file()
-    ]
+    async def _run(index: int, image_file: Path) -> None:
+        async with semaphore:
+            print(f"[{index}/{total}] {image_file.relative_to(images_dir)}")
+            await asyncio.to_thread(
+                process_single_image, image_file, client, skip_existing, cache_dir, preprocess_pool, writer
+            )
+    
+    async def _run_batch(index: int, batch: List[Path]) -> None:
+        async with semaphore:
+            print(f"[{index}-{index + len(batch) - 1}/{total}] {batch[0].relative_to(images_dir)} ...")
+            await asyncio.to_thread(process_image_batch, batch, client, cache_dir, preprocess_pool, writer)
+    
+    if batch_size > 1:
+        tasks = [
+            asyncio.create_task(_run_batch(start + 1, image_files[start:start + batch_size]))
+            for start in range(0, total, batch_size)
+        ]
+    else:
+        tasks = [asyncio.create_task(_run(i, f)) for i, f in enumerate(image_files, 1)]
+    for task in asyncio.as_completed(tasks):
+        await task
+
+
+def process_images(
+    images_dir: Path,
+    output_dir: Path,
+    skip_existing: bool = False,
+    limit: int | None = None,
+    concurrency: int = 10,
+    use_cache: bool = True,
+    client=None,
+    preprocess: bool = True,
+    ensure_dirs: bool = True,
+    batch_size: int = 1,
+) -> None:
+    """Process all images in IMAGES directory recursively.
+    
+    Results are cached under <output_dir>/.ocr_cache unless use_cache is False.
+    Pass `client` to reuse an existing Gemini client. With `preprocess`, images
+    are downscaled/recompressed across CPU cores before upload. Pass
+    `ensure_dirs=False` when the caller has already created output_dir. With
+    `batch_size` > 1, that many images are analyzed per Gemini request.
+    """
+    if ensure_dirs:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if client is None:
+        # Get API key
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("Error: GEMINI_API_KEY not set", file=sys.stderr)
+            sys.exit(1)
+        
+        client = get_client(api_key)
+    
+    # Find all image files recursively; with skip_existing, images that already
+    # have a JSON next to them are dropped during the walk itself
+    image_files = _find_image_files(images_dir, output_suffix=".json" if skip_existing else None)
     
     if not image_files:
-        print(f"No image files found in {images_dir}")
+        if skip_existing:
+            print(f"No unprocessed image files found in {images_dir}")
+        else:
+            print(f"No image files found in {images_dir}")
         return
     
     image_files = sorted(image_files)
@@ -254,23 +737,48 @@ def process_images(images_dir: Path, output_dir: Path, skip_existing: bool = Fal
         print(f"Limiting to first {limit} file(s)")
         image_files = image_files[:limit]
     
-    print(f"Found {len(image_files)} image file(s)")
+    if skip_existing:
+        print(f"Found {len(image_files)} image file(s) without existing JSON")
+    else:
+        print(f"Found {len(image_files)} image file(s)")
     
-    for i, image_file in enumerate(image_files, 1):
-        print(f"[{i}/{len(image_files)}] {image_file.relative_to(images_dir)}")
-        process_single_image(image_file, client, skip_existing)
+    cache_dir = output_dir / ".ocr_cache" if use_cache else None
+    writer = _JsonWriter()
+    pool = _LazyProcessPool(max_workers=os.cpu_count()) if preprocess else None
+    try:
+        asyncio.run(_process_images_concurrently(
+            image_files, images_dir, client, skip_existing, concurrency, cache_dir, pool, writer, batch_size
+        ))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # Every queued JSON is on disk before we report completion
+        writer.close()
     
     print(f"\nIMAGES processing complete. JSON files saved alongside images.")
 
 
 if __name__ == "__main__":
-    load_dotenv()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
     ap = argparse.ArgumentParser(description="Process images from IMAGES directory")
     ap.add_argument("--images-dir", type=Path, required=True)
     ap.add_argument("--output-dir", type=Path, required=True)
     ap.add_argument("--skip-existing", action="store_true")
     ap.add_argument("--limit", type=int, help="Limit number of files to process")
+    ap.add_argument("--concurrency", type=int, default=10, help="Images analyzed in parallel (default: 10)")
+    ap.add_argument("--no-cache", action="store_true", help="Ignore and do not write the on-disk OCR cache")
+    ap.add_argument("--no-preprocess", action="store_true", help="Upload original images without downscaling")
+    ap.add_argument("--batch-size", type=int, default=1, help="Images analyzed per Gemini request (default: 1)")
     args = ap.parse_args()
     
-    process_images(args.images_dir, args.output_dir, args.skip_existing, args.limit)
+    process_images(
+        args.images_dir,
+        args.output_dir,
+        args.skip_existing,
+        args.limit,
+        args.concurrency,
+        use_cache=not args.no_cache,
+        preprocess=not args.no_preprocess,
+        batch_size=args.batch_size,
+    )
 
@@ -12,23 +12,30 @@ For each Excel file, this module:
 from __future__ import annotations
 
 import os
+import re
 import sys
 import json
+import logging
 import argparse
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from dotenv import load_dotenv
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 
-try:
-    import pandas as pd
-    import openpyxl
-except ImportError:
-    print("Error: pandas and openpyxl required. Install with: pip install pandas openpyxl", file=sys.stderr)
-    sys.exit(1)
-
-from google import genai
+import _env  # noqa: F401  (loads .env once)
+from _common import JsonObjectTracker, dumps, get_client, iter_files, loads, strip_json_fence
 from google.genai import types
 
+logger = logging.getLogger(__name__)
+
+# Markdown code fence around a JSON payload (```json ... ``` or bare ``` ... ```)
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Bates number embedded in file names (HOUSE_OVERSIGHT_010477.txt -> 010477)
+_HO_RE = re.compile(r'HOUSE_OVERSIGHT_(\d+)')
+
+EXCEL_EXTENSIONS = frozenset({".xls", ".xlsx"})
+
 
 PROMPT_EXCEL_ANALYSIS = """You are analyzing an Excel spreadsheet from House Oversight Committee documentation.
 
@@ -114,34 +121,88 @@ CRITICAL RULES:
 """
 
 
-def read_excel_to_text(file_path: Path) -> str:
-    """Read Excel file and convert to structured text representation for LLM."""
-    try:
-        # Read all sheets
+# The instructions never change at runtime, so their Part is built once; each
+# request only adds a Part for the workbook text
+_PROMPT_EXCEL_PART = types.Part.from_text(text=PROMPT_EXCEL_ANALYSIS)
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    """Write obj as indented UTF-8 JSON, using orjson when it is installed."""
+    path.write_bytes(dumps(obj))
+
+
+def _iter_sheets(file_path: Path) -> Iterator[Tuple[str, Iterable[tuple]]]:
+    """Yield (sheet name, row-value tuples) for every worksheet, rows produced lazily.
+    
+    .xlsx workbooks are streamed with openpyxl in read-only, values-only mode so
+    no Cell objects or DataFrames are built and no sheet is held in memory as a
+    whole; legacy .xls goes through pandas. Both are imported here, on first
+    use, so startup and runs without any workbooks never pay for them.
+    """
+    if file_path.suffix.lower() != ".xlsx":
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("pandas is required for .xls files. Install with: pip install pandas xlrd") from e
         excel_file = pd.ExcelFile(file_path)
-        sheets_data = {}
-        
         for sheet_name in excel_file.sheet_names:
             df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-            # Convert to text representation
-            sheets_data[sheet_name] = {
-                "shape": df.shape,
-                "data": df.to_string(index=True, header=False)
-            }
-        
-        # Build text representation
-        text_parts = [f"FILE: {file_path.name}"]
-        text_parts.append(f"SHEETS: {', '.join(excel_file.sheet_names)}")
-        text_parts.append("")
+            df = df.astype(object).where(df.notna(), None)
+            yield sheet_name, df.itertuples(index=False, name=None)
+        return
+    
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("openpyxl is required for .xlsx files. Install with: pip install openpyxl") from e
+    
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in workbook.worksheets:
+            yield ws.title, ws.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_excel_to_text(file_path: Path) -> str:
+    """Read Excel file and convert to structured text representation for LLM.
+    
+    Results are memoized per (path, mtime, size), so retries and repeat calls
+    within a process skip re-parsing a workbook that has not changed.
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError as e:
+        return f"ERROR reading Excel file: {e}"
+    return _read_excel_to_text_cached(str(file_path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_excel_to_text_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Uncached body of read_excel_to_text; mtime_ns and size only key the cache."""
+    file_path = Path(path)
+    try:
+        # Build text representation: one tab-separated line per row, streamed
+        # straight from the workbook. The SHEETS and Dimensions lines are only
+        # known once the rows are read, so they are filled in afterwards.
+        text_parts = [f"FILE: {file_path.name}", "", ""]
+        sheet_names: List[str] = []
         
-        for sheet_name, sheet_info in sheets_data.items():
-            text_parts.append(f"=== WORKSHEET: {sheet_name} ===")
-            text_parts.append(f"Dimensions: {sheet_info['shape'][0]} rows x {sheet_info['shape'][1]} columns")
-            text_parts.append("")
-            text_parts.append("Data:")
-            text_parts.append(sheet_info['data'])
-            text_parts.append("")
+        with contextlib.closing(_iter_sheets(file_path)) as sheets:
+            for sheet_name, rows in sheets:
+                sheet_names.append(sheet_name)
+                text_parts.append(f"=== WORKSHEET: {sheet_name} ===")
+                dims_index = len(text_parts)
+                text_parts.extend(("", "", "Data:"))
+                n_rows = n_cols = 0
+                for row in rows:
+                    n_rows += 1
+                    n_cols = max(n_cols, len(row))
+                    text_parts.append("\t".join("" if v is None else str(v) for v in row))
+                text_parts[dims_index] = f"Dimensions: {n_rows} rows x {n_cols} columns"
+                text_parts.append("")
         
+        text_parts[1] = f"SHEETS: {', '.join(sheet_names)}"
         return "\n".join(text_parts)
     except Exception as e:
         return f"ERROR reading Excel file: {e}"
@@ -149,12 +210,13 @@ def read_excel_to_text(file_path: Path) -> str:
 
 def analyze_excel_with_llm(file_path: Path, excel_text: str, client) -> Dict[str, Any]:
     """Send Excel data to LLM for analysis."""
-    prompt = f"{PROMPT_EXCEL_ANALYSIS}\n\n--- EXCEL DATA ---\n{excel_text}\n--- END EXCEL DATA ---"
-    
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(text=prompt)]
+            parts=[
+                _PROMPT_EXCEL_PART,
+                types.Part.from_text(text=f"--- EXCEL DATA ---\n{excel_text}\n--- END EXCEL DATA ---"),
+            ]
         )
     ]
     
@@ -165,25 +227,39 @@ def analyze_excel_with_llm(file_path: Path, excel_text: str, client) -> Dict[str
         thinking_config=types.ThinkingConfig(thinking_budget=1024),
     )
     
-    out = ""
-    for chunk in client.models.generate_content_stream(
+    parts: List[str] = []
+    tracker = JsonObjectTracker()
+    stream = client.models.generate_content_stream(
         model="gemini-3-flash-preview",
         contents=contents,
         config=cfg,
-    ):
-        if chunk.text:
-            out += chunk.text
+    )
+    try:
+        for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                # Stop reading once the outermost JSON object has closed
+                if tracker.feed(chunk.text):
+                    break
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+    out = "".join(parts)
     
     try:
-        return json.loads(out.strip())
+        # Fenced responses are handled with plain string ops; the regex is only a fallback
+        return loads(strip_json_fence(out))
     except json.JSONDecodeError as e:
-        print(f"  Warning: LLM response not valid JSON: {e}", file=sys.stderr)
+        logger.warning("  Warning: LLM response for %s not valid JSON: %s", file_path.name, e)
         # Try to extract JSON from markdown code blocks
-        if "```json" in out:
-            json_start = out.find("```json") + 7
-            json_end = out.find("```", json_start)
-            if json_end > json_start:
-                return json.loads(out[json_start:json_end].strip())
+        fence = _JSON_FENCE_RE.search(out)
+        if fence:
+            return loads(fence.group(1))
+        # An early stop can leave a preamble before the object
+        json_start = out.find("{")
+        if json_start > 0 and tracker.complete:
+            return loads(out[json_start:])
         # Fallback: return raw text wrapped in structure
         return {
             "file_name": file_path.name,
@@ -213,64 +289,101 @@ def process_single_excel(file_path: Path, output_dir: Path, client, skip_existin
         # Add file_path and house_oversight_id to analysis for consistency
         analysis["file_path"] = str(file_path.relative_to(file_path.parents[2]))  # Relative to BATCH7
         # Extract HOUSE_OVERSIGHT ID from filename
-        import re
-        id_match = re.search(r'HOUSE_OVERSIGHT_(\d+)', file_path.name)
+        id_match = _HO_RE.search(file_path.name)
         if id_match:
             analysis["house_oversight_id"] = id_match.group(1)
         
         # Save result in same folder as Excel file
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(analysis, f, ensure_ascii=False, indent=2)
+        _write_json(output_file, analysis)
         
         print(f"    Saved: {output_file.name}")
         
     except Exception as e:
-        print(f"    ERROR processing {file_path.name}: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("    ERROR processing %s: %s", file_path.name, e)
+
+
+# Upper bound on workbooks analyzed at once, whatever the configured concurrency
+NATIVES_MAX_WORKERS = 32
+
+
+def _natives_concurrency(concurrency: Optional[int]) -> int:
+    """Resolve the worker count: explicit value, then NATIVES_CONCURRENCY, then GEMINI_PARALLEL, else 8."""
+    if concurrency is None:
+        concurrency = int(os.environ.get("NATIVES_CONCURRENCY") or os.environ.get("GEMINI_PARALLEL") or 8)
+    return max(1, min(NATIVES_MAX_WORKERS, concurrency))
 
 
-def process_natives(natives_dir: Path, output_dir: Path, skip_existing: bool = False) -> None:
+def process_natives(
+    natives_dir: Path,
+    output_dir: Path,
+    skip_existing: bool = False,
+    client=None,
+    concurrency: Optional[int] = None,
+) -> None:
     """Process all Excel files in NATIVES directory.
     
     Note: output_dir parameter is kept for API compatibility but JSON files
     are saved next to Excel files (same folder), not in output_dir.
+    Pass `client` to reuse an existing Gemini client. Up to `concurrency`
+    workbooks (default: $NATIVES_CONCURRENCY, $GEMINI_PARALLEL or 8) are
+    analyzed at once; the shared client is safe to use from several threads.
     """
     # output_dir not used for per-file outputs, but kept for compatibility
     
-    # Get API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set", file=sys.stderr)
-        sys.exit(1)
-    
-    client = genai.Client(api_key=api_key)
+    if client is None:
+        # Get API key
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("Error: GEMINI_API_KEY not set", file=sys.stderr)
+            sys.exit(1)
+        
+        client = get_client(api_key)
     
-    # Find all Excel files recursively
-    excel_files = []
-    for ext in [".xls", ".xlsx"]:
-        excel_files.extend(natives_dir.rglob(f"*{ext}"))
+    # Find all Excel files recursively in a single walk; with skip_existing,
+    # workbooks that already have an _analysis.json are dropped during the walk
+    excel_files = list(iter_files(
+        natives_dir, EXCEL_EXTENSIONS, "_analysis.json" if skip_existing else None
+    ))
     
     if not excel_files:
-        print(f"No Excel files found in {natives_dir}")
+        if skip_existing:
+            print(f"No unprocessed Excel files found in {natives_dir}")
+        else:
+            print(f"No Excel files found in {natives_dir}")
         return
     
-    print(f"Found {len(excel_files)} Excel file(s)")
+    if skip_existing:
+        print(f"Found {len(excel_files)} Excel file(s) without existing analysis")
+    else:
+        print(f"Found {len(excel_files)} Excel file(s)")
+    
+    # Each workbook is one network-bound Gemini call, so overlap them in threads;
+    # the pool size is also the cap on requests in flight (keeps us clear of 429s)
+    max_workers = min(_natives_concurrency(concurrency), len(excel_files))
     
-    for i, excel_file in enumerate(sorted(excel_files), 1):
+    def _run(indexed_file):
+        i, excel_file = indexed_file
         print(f"[{i}/{len(excel_files)}] {excel_file.relative_to(natives_dir)}")
         process_single_excel(excel_file, output_dir, client, skip_existing)
     
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        list(ex.map(_run, enumerate(sorted(excel_files), 1)))
+    
     print(f"\nNATIVES processing complete. JSON files saved alongside Excel files.")
 
 
 if __name__ == "__main__":
-    load_dotenv()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
     ap = argparse.ArgumentParser(description="Process Excel spreadsheets from NATIVES directory")
     ap.add_argument("--natives-dir", type=Path, required=True)
     ap.add_argument("--output-dir", type=Path, required=True)
     ap.add_argument("--skip-existing", action="store_true")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        help="Workbooks analyzed in parallel (default: $NATIVES_CONCURRENCY, $GEMINI_PARALLEL or 8)",
+    )
     args = ap.parse_args()
     
-    process_natives(args.natives_dir, args.output_dir, args.skip_existing)
+    process_natives(args.natives_dir, args.output_dir, args.skip_existing, concurrency=args.concurrency)
 
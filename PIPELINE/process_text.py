@@ -11,17 +11,42 @@ This module:
 """
 from __future__ import annotations
 
+import io
 import os
+import re
+import mmap
 import sys
 import json
+import time
+import hashlib
+import random
+import tarfile
 import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional, Tuple, Union
+import _env  # noqa: F401  (loads .env once)
+from _common import JsonObjectTracker, dumps, get_client, hash_file, iter_files, loads, store_cache_entry
 
-from google import genai
 from google.genai import types
-import traceback
+
+# Paragraph boundaries used to find boilerplate repeated across files
+_SEGMENT_SPLIT_RE = re.compile(r"\n\s*\n+")
+
+# Text files at least this large are memory-mapped instead of read into a buffer
+_MMAP_MIN_BYTES = 1 << 16
+
+# Repeated segments shorter than this (sign-offs, "Thanks,") are left inline
+_MIN_REPEATED_SEGMENT_CHARS = 40
+
+# Markdown code fence around a JSON payload (```json ... ``` or bare ``` ... ```)
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Outermost JSON object in a model reply, fenced or surrounded by prose
+_JSON_EXTRACT = re.compile(r"\{.*\}", re.DOTALL)
+# Bates number embedded in file names (HOUSE_OVERSIGHT_010477.txt -> 010477)
+_HO_RE = re.compile(r'HOUSE_OVERSIGHT_(\d+)')
 
 
 PROMPT_TEXT_EXTRACTION = """You are analyzing a text file from House Oversight Committee documentation.
@@ -156,6 +181,51 @@ CRITICAL RULES:
 - Maintain chronological order when possible
 """
 
+# The instructions never change at runtime, so their Parts are built once; each
+# request only adds a Part for its own text
+_PROMPT_TEXT_PART = types.Part.from_text(text=PROMPT_TEXT_EXTRACTION)
+_PROMPT_STORY_PART = types.Part.from_text(text=PROMPT_STORY_ASSEMBLY)
+
+TEXT_MODEL = "gemini-3-flash-preview"
+
+# Bump when PROMPT_TEXT_EXTRACTION's expected output changes in ways the prompt
+# text alone does not capture (e.g. post-processing of the reply)
+PROMPT_TEXT_VERSION = "1"
+
+# Extraction cache entries are only valid for this prompt, model and version
+_CACHE_KEY_SUFFIX = f"{PROMPT_TEXT_EXTRACTION}|{TEXT_MODEL}|{PROMPT_TEXT_VERSION}".encode("utf-8")
+
+PROMPT_FUSED_RUN = """You are given a small set of text files from House Oversight Committee documentation.
+Perform BOTH tasks below in a single response.
+
+TASK 1 - EXTRACTION: for EACH file, produce the object described under
+"EXTRACTION INSTRUCTIONS", with "file_name" set to that file's name.
+
+TASK 2 - STORY ASSEMBLY: group the files into stories as described under
+"STORY ASSEMBLY INSTRUCTIONS".
+
+OUTPUT FORMAT (STRICT JSON ONLY):
+{
+  "extractions": [<one extraction object per file, in the order the files are given>],
+  "stories": <the story assembly object>
+}
+"""
+
+# A fused run repeats every file's full text in its reply, so the budget covers the
+# files themselves; larger runs use the per-file extraction + assembly flow
+FUSED_CALL_TOKEN_BUDGET = 16_000
+
+
+def _write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """Write data to path in one call; accepts plain string paths as well as Paths."""
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _write_json(path: Union[str, Path], obj: Any) -> None:
+    """Write obj as indented UTF-8 JSON, using orjson when it is installed."""
+    _write_bytes(path, dumps(obj))
+
 
 def _is_extraction_error_artifact(path: Path) -> bool:
     """Return True when the TXT file is one of our *_extraction_error artifacts."""
@@ -163,6 +233,24 @@ def _is_extraction_error_artifact(path: Path) -> bool:
     return "_extraction_error" in stem
 
 
+def _raw_artifact(raw_dir: Path, text_path: Path, suffix: str) -> Path:
+    """Return the file under raw_dir holding a raw model reply for text_path.
+    
+    A digest of the full path keeps same-named files from different folders apart.
+    """
+    tag = hashlib.sha1(os.fsencode(text_path)).hexdigest()[:8]
+    return raw_dir / f"{text_path.stem}.{tag}{suffix}"
+
+
+def _open_raw_artifact(path: Path):
+    """Open a raw-reply file for writing, creating raw_dir only when the first one is written."""
+    try:
+        return open(path, "w", encoding="utf-8")
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "w", encoding="utf-8")
+
+
 def _log_extraction_error(
     text_path: Path,
     message: str,
@@ -216,29 +304,132 @@ def _build_fallback_result(
     return fallback
 
 
-def extract_text_content(text_path: Path, client, save_per_file: bool = True) -> Dict[str, Any]:
+def _read_text_file(text_path: Path) -> str:
+    """Read a text file as UTF-8 with raw os.read calls instead of a buffered text stream.
+    
+    Files of _MMAP_MIN_BYTES or more are memory-mapped and decoded straight from
+    the mapping, so the kernel pages them in lazily and no intermediate bytes
+    copy is made. Undecodable bytes are replaced and CRLF/CR newlines become LF,
+    matching what open(..., "r", errors="replace") would return.
+    """
+    fd = os.open(text_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        if size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8", "replace")
+        else:
+            blocks = []
+            while True:
+                block = os.read(fd, max(size, 1 << 16))
+                if not block:
+                    break
+                blocks.append(block)
+            text = b"".join(blocks).decode("utf-8", errors="replace")
+    finally:
+        os.close(fd)
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _apply_text_identity(result: Dict[str, Any], text_path: Path) -> None:
+    """Point a copied extraction at text_path: file name, path and HOUSE_OVERSIGHT ID."""
+    result["file_name"] = text_path.name
+    result["file_path"] = str(text_path.relative_to(text_path.parents[1]))  # Adjusted for root
+    result.pop("house_oversight_id", None)
+    id_match = _HO_RE.search(text_path.name)
+    if id_match:
+        result["house_oversight_id"] = id_match.group(1)
+
+
+def _reuse_duplicate_extraction(source: Dict[str, Any], text_path: Path) -> Dict[str, Any]:
+    """Clone the extraction of a byte-identical file for text_path and save it alongside."""
+    result = loads(dumps(source, indent=False))
+    _apply_text_identity(result, text_path)
+    result["duplicate_of"] = source.get("file_name")
+    
+    extraction_file = text_path.parent / f"{text_path.stem}_extraction.json"
+    _write_json(extraction_file, result)
+    return result
+
+
+def _extraction_cache_file(cache_dir: Optional[Path], digest: str) -> Optional[Path]:
+    """Return the cache entry for a file's sha256 digest under the current prompt and model."""
+    if cache_dir is None:
+        return None
+    h = hashlib.sha256(digest.encode("ascii"))
+    h.update(_CACHE_KEY_SUFFIX)
+    key = h.hexdigest()
+    return cache_dir / key[:2] / f"{key}.json"
+
+
+def _read_cached_extraction(cache_file: Optional[Path], text_path: Path) -> Optional[Dict[str, Any]]:
+    """Return the cached extraction stamped for text_path and saved alongside it, or None on a miss."""
+    if cache_file is None:
+        return None
+    # Just try the open: a miss costs the same single failed syscall as exists()
+    try:
+        with open(cache_file, "rb") as f:
+            result = loads(f.read())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(result, dict) or "error" in result:
+        return None
+    _apply_text_identity(result, text_path)
+    result.setdefault("processing_metadata", {})["cache_hit"] = True
+    
+    extraction_file = text_path.parent / f"{text_path.stem}_extraction.json"
+    _write_json(extraction_file, result)
+    return result
+
+
+# Bounded retry for per-file requests that fail with a transient status
+TEXT_RETRY_ATTEMPTS = 5
+TEXT_RETRY_BASE_SECONDS = 1.0
+TEXT_RETRY_MAX_SECONDS = 30.0
+_TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _is_transient_error(exc: Exception) -> bool:
+    """Return True for Gemini API errors worth retrying (rate limits, overloads)."""
+    return getattr(exc, "code", None) in _TRANSIENT_STATUS_CODES
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    cap = min(TEXT_RETRY_MAX_SECONDS, TEXT_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, cap)
+
+
+def extract_text_content(
+    text_path: Path,
+    client,
+    save_per_file: bool = True,
+    raw_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
     """Extract and structure content from a text file.
     
     Args:
         text_path: Path to text file
         client: Gemini client
         save_per_file: If True, save extraction JSON next to text file (consistent with images/natives)
+        raw_dir: If set, tee the streamed reply to a file in this directory (created on demand)
+            and keep it as <stem>.<tag>_extraction_error.raw.txt when extraction fails
     """
     try:
-        with open(text_path, "r", encoding="utf-8", errors="replace") as f:
-            text_content = f.read()
+        text_content = _read_text_file(text_path)
     except Exception as e:
         return {
             "file_name": text_path.name,
             "error": f"Failed to read file: {e}"
         }
     
-    prompt = f"{PROMPT_TEXT_EXTRACTION}\n\n--- TEXT FILE ---\n{text_content}\n--- END TEXT FILE ---"
-    
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(text=prompt)]
+            parts=[
+                _PROMPT_TEXT_PART,
+                types.Part.from_text(text=f"--- TEXT FILE ---\n{text_content}\n--- END TEXT FILE ---"),
+            ]
         )
     ]
     
@@ -249,39 +440,81 @@ def extract_text_content(text_path: Path, client, save_per_file: bool = True) ->
         thinking_config=types.ThinkingConfig(thinking_budget=512),
     )
     
-    out = ""
     blocked_reason = None
     blocked_message = None
     stream_exception: Optional[Exception] = None
     stream_traceback = ""
     
+    tracker = JsonObjectTracker()
+    stream = None
+    
+    # Tee the streamed body to a file under raw_dir instead of growing a string chunk
+    # by chunk; it is read back once for parsing and kept only if extraction fails.
+    raw_path = _raw_artifact(raw_dir, text_path, ".raw.json.part") if raw_dir is not None else None
+    raw_fh = _open_raw_artifact(raw_path) if raw_path is not None else io.StringIO()
+    
     try:
-        for chunk in client.models.generate_content_stream(
-            model="gemini-3-flash-preview",
-            contents=contents,
-            config=cfg,
-        ):
-            prompt_feedback = getattr(chunk, "prompt_feedback", None)
-            if prompt_feedback and prompt_feedback.block_reason:
-                block_enum = prompt_feedback.block_reason
-                blocked_reason = (
-                    block_enum.value if hasattr(block_enum, "value") else str(block_enum)
+        for attempt in range(1, TEXT_RETRY_ATTEMPTS + 1):
+            stream = None
+            retry_error: Optional[Exception] = None
+            try:
+                stream = client.models.generate_content_stream(
+                    model=TEXT_MODEL,
+                    contents=contents,
+                    config=cfg,
                 )
-                blocked_message = prompt_feedback.block_reason_message or ""
+                for chunk in stream:
+                    prompt_feedback = getattr(chunk, "prompt_feedback", None)
+                    if prompt_feedback and prompt_feedback.block_reason:
+                        block_enum = prompt_feedback.block_reason
+                        blocked_reason = (
+                            block_enum.value if hasattr(block_enum, "value") else str(block_enum)
+                        )
+                        blocked_message = prompt_feedback.block_reason_message or ""
+                        break
+                    
+                    candidates = getattr(chunk, "candidates", None)
+                    if candidates:
+                        candidate = candidates[0]
+                        if candidate.finish_reason == types.FinishReason.SAFETY:
+                            blocked_reason = "SAFETY"
+                            blocked_message = "Model stopped early due to safety filters."
+                            break
+                    
+                    if chunk.text:
+                        raw_fh.write(chunk.text)
+                        # Stop as soon as the outermost JSON object closes; anything after it
+                        # is trailing prose we would discard anyway.
+                        if tracker.feed(chunk.text):
+                            break
+            except Exception as exc:
+                # Rate limits and overloads that hit before any output are retried
+                # here rather than failing the file
+                if attempt < TEXT_RETRY_ATTEMPTS and raw_fh.tell() == 0 and _is_transient_error(exc):
+                    retry_error = exc
+                else:
+                    stream_exception = exc
+                    stream_traceback = traceback.format_exc()
+            finally:
+                # Release the HTTP connection when we bail out of the stream early
+                close = getattr(stream, "close", None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception:
+                        pass
+            if retry_error is None:
                 break
-            
-            if chunk.candidates:
-                candidate = chunk.candidates[0]
-                if candidate.finish_reason == types.FinishReason.SAFETY:
-                    blocked_reason = "SAFETY"
-                    blocked_message = "Model stopped early due to safety filters."
-                    break
-            
-            if chunk.text:
-                out += chunk.text
-    except Exception as exc:
-        stream_exception = exc
-        stream_traceback = traceback.format_exc()
+            delay = _retry_delay(attempt)
+            print(f"    Transient Gemini error ({retry_error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+    finally:
+        out = raw_fh.getvalue() if raw_path is None else None
+        raw_fh.close()
+    
+    if out is None:
+        out = raw_path.read_text(encoding="utf-8")
+    keep_raw = stream_exception is not None
     
     # Parse JSON response with better error handling
     result: Optional[Dict[str, Any]] = None
@@ -324,57 +557,53 @@ def extract_text_content(text_path: Path, client, save_per_file: bool = True) ->
                 raw_preview=out[:500],
             )
     else:
-        json_text = out.strip()
-        
-        # Try to extract JSON from markdown code blocks if present
-        if "```json" in json_text:
-            json_start = json_text.find("```json") + 7
-            json_end = json_text.find("```", json_start)
-            if json_end > json_start:
-                json_text = json_text[json_start:json_end].strip()
-        elif "```" in json_text:
-            # Try generic code block
-            json_start = json_text.find("```") + 3
-            json_end = json_text.find("```", json_start)
-            if json_end > json_start:
-                json_text = json_text[json_start:json_end].strip()
-        
-        # Try to find JSON object boundaries if response has extra text
-        if not json_text.startswith("{"):
-            json_start = json_text.find("{")
-            if json_start >= 0:
-                json_text = json_text[json_start:]
-                # Find matching closing brace
-                brace_count = 0
-                for i, char in enumerate(json_text):
-                    if char == "{":
-                        brace_count += 1
-                    elif char == "}":
-                        brace_count -= 1
-                        if brace_count == 0:
-                            json_text = json_text[:i+1]
-                            break
-        
-        try:
-            result = json.loads(json_text)
-        except json.JSONDecodeError as e:
-            # Log the error and raw response for debugging
-            error_file = _log_extraction_error(
-                text_path,
-                f"JSON Parse Error: {e}",
-                raw_response=out,
-                attempted_json=json_text,
-            )
-            print(f"    Warning: Failed to parse JSON for {text_path.name}. Error saved to {error_file.name}")
-            
-            # Fallback: return basic structure with full text
-            result = _build_fallback_result(
-                text_path,
-                text_content,
-                f"Failed to parse LLM response: {str(e)}",
-                raw_preview=out[:500],
-            )
+        result, parse_failed = _parse_extraction(text_path, text_content, out)
+        keep_raw = keep_raw or parse_failed
     
+    if raw_path is not None:
+        if keep_raw and out:
+            raw_path.replace(_raw_artifact(raw_dir, text_path, "_extraction_error.raw.txt"))
+        else:
+            raw_path.unlink(missing_ok=True)
+    
+    return _finish_extraction(text_path, text_content, result, save_per_file)
+
+
+def _parse_extraction(text_path: Path, text_content: str, out: str) -> Tuple[Dict[str, Any], bool]:
+    """Parse the model's reply for text_path; return (result, True) with a fallback result on bad JSON."""
+    # One scan from the first "{" to the last "}" drops code fences and any
+    # prose around the object
+    match = _JSON_EXTRACT.search(out)
+    json_text = match.group(0) if match else out.strip()
+    
+    try:
+        return loads(json_text), False
+    except json.JSONDecodeError as e:
+        # Log the error and raw response for debugging
+        error_file = _log_extraction_error(
+            text_path,
+            f"JSON Parse Error: {e}",
+            raw_response=out,
+            attempted_json=json_text,
+        )
+        print(f"    Warning: Failed to parse JSON for {text_path.name}. Error saved to {error_file.name}")
+        
+        # Fallback: return basic structure with full text
+        return _build_fallback_result(
+            text_path,
+            text_content,
+            f"Failed to parse LLM response: {str(e)}",
+            raw_preview=out[:500],
+        ), True
+
+
+def _finish_extraction(
+    text_path: Path,
+    text_content: str,
+    result: Optional[Dict[str, Any]],
+    save_per_file: bool,
+) -> Dict[str, Any]:
+    """Fill in file/ID/processing fields and save the per-file extraction JSON."""
     if result:
         # Add required fields if not present
         if "file_name" not in result:
@@ -383,24 +612,21 @@ def extract_text_content(text_path: Path, client, save_per_file: bool = True) ->
             result["file_path"] = str(text_path.relative_to(text_path.parents[1])) # Adjusted for root
         
         # Extract HOUSE_OVERSIGHT ID from filename
-        import re
         if "house_oversight_id" not in result:
-            id_match = re.search(r'HOUSE_OVERSIGHT_(\d+)', text_path.name)
+            id_match = _HO_RE.search(text_path.name)
             if id_match:
                 result["house_oversight_id"] = id_match.group(1)
         
         # Add processing metadata
-        import datetime
         result["processing_metadata"] = {
-            "processed_at": datetime.datetime.utcnow().isoformat() + "Z",
-            "model": "gemini-3-flash-preview"
+            "processed_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "model": TEXT_MODEL
         }
         
         # Save per-file JSON next to text file (consistent with images/natives)
         if save_per_file:
             extraction_file = text_path.parent / f"{text_path.stem}_extraction.json"
-            with open(extraction_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            _write_json(extraction_file, result)
         
         return result
     
@@ -413,30 +639,222 @@ def extract_text_content(text_path: Path, client, save_per_file: bool = True) ->
     }
     if save_per_file:
         extraction_file = text_path.parent / f"{text_path.stem}_extraction.json"
-        with open(extraction_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        _write_json(extraction_file, result)
     return result
 
 
+# Generation settings for extraction requests submitted through the Batch API
+# (REST field names; mirrors the GenerateContentConfig used for streaming)
+_BATCH_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "response_mime_type": "application/json",
+    "max_output_tokens": 16384,
+    "thinking_config": {"thinking_budget": 512},
+}
+
+_BATCH_DONE_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+})
+
+
+# Batch jobs can sit in the queue for hours; past this the job is cancelled and
+# the stage falls back to streaming requests
+BATCH_MAX_WAIT_SECONDS = 6 * 60 * 60
+
+
+def _wait_for_batch(
+    client,
+    job,
+    poll_seconds: float = 5.0,
+    max_poll_seconds: float = 60.0,
+    max_wait: float = BATCH_MAX_WAIT_SECONDS,
+):
+    """Poll a batch job with exponential backoff until it reaches a terminal state.
+    
+    Transient errors from batches.get are retried like streaming requests. Raises
+    RuntimeError, as for any failed job, when max_wait seconds pass first.
+    """
+    deadline = time.monotonic() + max_wait
+    delay = poll_seconds
+    while job.state.name not in _BATCH_DONE_STATES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            try:
+                client.batches.cancel(name=job.name)
+            except Exception:
+                pass  # best effort; the job expires on its own otherwise
+            raise RuntimeError(f"Batch job {job.name} still {job.state.name} after {max_wait:.0f}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_poll_seconds)
+        for attempt in range(1, TEXT_RETRY_ATTEMPTS + 1):
+            try:
+                job = client.batches.get(name=job.name)
+                break
+            except Exception as exc:
+                if attempt == TEXT_RETRY_ATTEMPTS or not _is_transient_error(exc):
+                    raise
+                time.sleep(_retry_delay(attempt))
+    return job
+
+
+def _batch_response_text(record: Dict[str, Any]) -> str:
+    """Join the non-thought text parts of the first candidate in a batch output line."""
+    candidates = record.get("response", {}).get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts if not part.get("thought"))
+
+
+def extract_text_batch(
+    text_paths: List[Path],
+    client,
+    save_per_file: bool = True,
+    raw_dir: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Extract several text files through one Gemini Batch API job.
+    
+    All requests go into a single in-memory JSONL upload; the job is polled until
+    it finishes and its output is matched back to the inputs by key. Results come
+    back in input order and match extract_text_content's, including the raw
+    replies kept under raw_dir. Raises RuntimeError when the job does not succeed
+    so the caller can fall back to streaming requests.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(text_paths)
+    texts: Dict[str, str] = {}
+    lines = []
+    for i, text_path in enumerate(text_paths):
+        try:
+            text_content = _read_text_file(text_path)
+        except Exception as e:
+            results[i] = {"file_name": text_path.name, "error": f"Failed to read file: {e}"}
+            continue
+        key = str(i)
+        texts[key] = text_content
+        lines.append(dumps({
+            "key": key,
+            "request": {
+                "contents": [{
+                    "role": "user",
+                    "parts": [
+                        {"text": PROMPT_TEXT_EXTRACTION},
+                        {"text": f"--- TEXT FILE ---\n{text_content}\n--- END TEXT FILE ---"},
+                    ],
+                }],
+                "generation_config": _BATCH_GENERATION_CONFIG,
+            },
+        }, indent=False))
+    
+    if lines:
+        uploaded = client.files.upload(
+            file=io.BytesIO(b"\n".join(lines)),
+            config=types.UploadFileConfig(display_name="text-extractions", mime_type="jsonl"),
+        )
+        job = client.batches.create(
+            model=TEXT_MODEL,
+            src=uploaded.name,
+            config={"display_name": "text-extractions"},
+        )
+        job = _wait_for_batch(client, job)
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job.name} ended in {job.state.name}")
+        
+        output = client.files.download(file=job.dest.file_name)
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = loads(line)
+            key = record.get("key")
+            if key not in texts:
+                continue
+            i = int(key)
+            text_path = text_paths[i]
+            if "error" in record:
+                message = f"LLM request failed: {record['error']}"
+                error_file = _log_extraction_error(text_path, message)
+                print(f"    Warning: {message}. Error saved to {error_file.name}")
+                result = _build_fallback_result(text_path, texts[key], message)
+            else:
+                out = _batch_response_text(record)
+                result, parse_failed = _parse_extraction(text_path, texts[key], out)
+                if parse_failed and out and raw_dir is not None:
+                    with _open_raw_artifact(_raw_artifact(raw_dir, text_path, "_extraction_error.raw.txt")) as f:
+                        f.write(out)
+            results[i] = _finish_extraction(text_path, texts[key], result, save_per_file)
+    
+    # Inputs the job returned nothing for are reported like any other failed request
+    for i, text_path in enumerate(text_paths):
+        if results[i] is None:
+            message = "LLM request failed: no response in batch output"
+            result = _build_fallback_result(text_path, texts[str(i)], message)
+            results[i] = _finish_extraction(text_path, texts[str(i)], result, save_per_file)
+    return results
+
+
+def _split_segments(text: str) -> List[str]:
+    """Split text into non-empty paragraph segments."""
+    return [seg.strip() for seg in _SEGMENT_SPLIT_RE.split(text) if seg.strip()]
+
+
+def _collapse_repeated_segments(text: str, file_name: str, seen: Dict[str, str]) -> str:
+    """Replace paragraphs already shown for an earlier file with a short back-reference.
+    
+    `seen` maps segment hashes to the first file they appeared in and is updated in place.
+    """
+    segments = []
+    for seg in _split_segments(text):
+        key = hashlib.blake2b(seg.encode("utf-8"), digest_size=8).hexdigest()
+        first_file = seen.setdefault(key, file_name)
+        if first_file != file_name and len(seg) >= _MIN_REPEATED_SEGMENT_CHARS:
+            segments.append(f"[repeated segment, same as in {first_file}]")
+        else:
+            segments.append(seg)
+    return "\n\n".join(segments)
+
+
 def assemble_stories(text_extractions: List[Dict[str, Any]], client) -> Dict[str, Any]:
     """Group text files into stories using LLM."""
-    # Build input listing
-    listing_parts = ["--- TEXT FILES START ---"]
+    # Build input listing; boilerplate paragraphs (letterheads, footers, signature
+    # blocks) are sent once and referenced afterwards to save prompt tokens
+    seen_segments: Dict[str, str] = {}
+    # Files whose whole text is identical are listed once, naming the copies;
+    # the copies are added back to the representative's stories afterwards
+    representatives: Dict[str, str] = {}
+    copies: Dict[str, List[str]] = {}
+    listed = []
     for ext in text_extractions:
-        listing_parts.append(f"=== FILE: {ext.get('file_name', 'unknown')} ===")
-        listing_parts.append(f"Content: {ext.get('content', {}).get('full_text', '')[:2000]}...")
-        listing_parts.append(f"Metadata: {json.dumps(ext.get('metadata', {}), ensure_ascii=False)}")
-        listing_parts.append(f"Entities: {json.dumps(ext.get('entities', {}), ensure_ascii=False)}")
+        file_name = ext.get('file_name', 'unknown')
+        full_text = ext.get('content', {}).get('full_text', '')
+        if full_text:
+            digest = hashlib.sha256(full_text.encode("utf-8")).hexdigest()
+            representative = representatives.setdefault(digest, file_name)
+            if representative != file_name:
+                copies.setdefault(representative, []).append(file_name)
+                continue
+        listed.append(ext)
+    
+    listing_parts = ["--- TEXT FILES START ---"]
+    for ext in listed:
+        file_name = ext.get('file_name', 'unknown')
+        preview = _collapse_repeated_segments(
+            ext.get('content', {}).get('full_text', '')[:2000], file_name, seen_segments
+        )
+        listing_parts.append(f"=== FILE: {file_name} ===")
+        if file_name in copies:
+            listing_parts.append(f"Identical copies: {', '.join(copies[file_name])}")
+        listing_parts.append(f"Content: {preview}...")
+        listing_parts.append(f"Metadata: {dumps(ext.get('metadata', {}), indent=False).decode('utf-8')}")
+        listing_parts.append(f"Entities: {dumps(ext.get('entities', {}), indent=False).decode('utf-8')}")
         listing_parts.append("=== FILE END ===")
     listing_parts.append("--- TEXT FILES END ---")
     
     listing = "\n".join(listing_parts)
-    prompt = f"{PROMPT_STORY_ASSEMBLY}\n\n{listing}"
     
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(text=prompt)]
+            parts=[_PROMPT_STORY_PART, types.Part.from_text(text=listing)]
         )
     ]
     
@@ -447,23 +865,36 @@ def assemble_stories(text_extractions: List[Dict[str, Any]], client) -> Dict[str
         thinking_config=types.ThinkingConfig(thinking_budget=1024),
     )
     
-    out = ""
-    for chunk in client.models.generate_content_stream(
-        model="gemini-3-flash-preview",
+    parts: List[str] = []
+    tracker = JsonObjectTracker()
+    stream = client.models.generate_content_stream(
+        model=TEXT_MODEL,
         contents=contents,
         config=cfg,
-    ):
-        if chunk.text:
-            out += chunk.text
+    )
+    try:
+        for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                # The story plan is a single object; stop reading once it closes
+                if tracker.feed(chunk.text):
+                    break
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+    out = "".join(parts)
     
     json_text = out.strip()
-    if "```json" in json_text:
-        json_text = json_text.split("```json")[1].split("```")[0].strip()
-    elif "```" in json_text:
-        json_text = json_text.split("```")[1].split("```")[0].strip()
+    fence = _JSON_FENCE_RE.search(json_text)
+    if fence:
+        json_text = fence.group(1)
 
     try:
-        return json.loads(json_text)
+        result = loads(json_text)
     except json.JSONDecodeError:
         print(f"Error parsing story assembly JSON: {json_text[:200]}...")
         return {
@@ -471,60 +902,281 @@ def assemble_stories(text_extractions: List[Dict[str, Any]], client) -> Dict[str
             "unassigned_files": [ext["file_name"] for ext in text_extractions],
             "error": "Failed to parse story assembly response"
         }
+    if copies and isinstance(result, dict):
+        _expand_identical_copies(result, copies)
+    return result
 
 
-def create_story_folders(stories: Dict[str, Any], output_dir: Path, text_extractions_by_file: Dict[str, Dict[str, Any]]) -> None:
-    """Create letters/ folder structure similar to Dorle's Stories."""
-    letters_dir = output_dir / "letters"
-    letters_dir.mkdir(parents=True, exist_ok=True)
+def _expand_identical_copies(assembly: Dict[str, Any], copies: Dict[str, List[str]]) -> None:
+    """Add each listed file's identical copies next to it in stories and unassigned files."""
+    def _expand(names: List[str]) -> List[str]:
+        # dict keeps order and drops copies the model already named itself
+        expanded: Dict[str, None] = {}
+        for name in names:
+            expanded[name] = None
+            expanded.update(dict.fromkeys(copies.get(name, ())))
+        return list(expanded)
     
+    for story in assembly.get("stories") or []:
+        if isinstance(story, dict) and isinstance(story.get("text_files"), list):
+            story["text_files"] = _expand(story["text_files"])
+    if isinstance(assembly.get("unassigned_files"), list):
+        assembly["unassigned_files"] = _expand(assembly["unassigned_files"])
+
+
+STORY_WRITE_WORKERS = 4
+
+# With pack=None, runs with more stories than this write letters.tar instead of folders
+PACK_MIN_STORIES = 1000
+
+
+def _story_files(story: Dict[str, Any]) -> List[Tuple[str, bytes]]:
+    """Return (file name, contents) for the files kept per story, as prebuilt buffers."""
+    return [
+        # Compact JSON since meta.json is read by tools, not people
+        ("meta.json", dumps(story, indent=False) + b"\n"),
+        ("text.txt", story.get("assembled_text", "").encode("utf-8")),
+        ("source_files.txt", "\n".join(story.get("text_files", [])).encode("utf-8")),
+    ]
+
+
+def _write_story_folder(story_dir: str, story: Dict[str, Any]) -> None:
+    """Write meta.json, text.txt and source_files.txt for one story."""
+    os.makedirs(story_dir, exist_ok=True)
+    for name, data in _story_files(story):
+        _write_bytes(os.path.join(story_dir, name), data)
+
+
+def _write_story_tar(tar_path: Path, by_dir: Dict[str, Dict[str, Any]]) -> None:
+    """Pack every story's files into one uncompressed tar as <story id>/<file name>."""
+    mtime = time.time()
+    with tarfile.open(tar_path, "w") as tf:
+        for story_id, story in by_dir.items():
+            for name, data in _story_files(story):
+                info = tarfile.TarInfo(f"{story_id}/{name}")
+                info.size = len(data)
+                info.mtime = mtime
+                tf.addfile(info, io.BytesIO(data))
+
+
+def create_story_folders(
+    stories: Dict[str, Any],
+    output_dir: Path,
+    text_extractions_by_file: Dict[str, Dict[str, Any]],
+    ensure_dirs: bool = True,
+    pack: Optional[bool] = False,
+) -> Path:
+    """Create letters/ folder structure similar to Dorle's Stories.
+    
+    With `pack=True` the same files go into output_dir/letters.tar instead, one
+    <story id>/ prefix per story, which keeps the inode count flat on huge runs;
+    `pack=None` packs only above PACK_MIN_STORIES stories. Returns the folder or
+    tar file written.
+    """
+    # Stories without an id share the S0000 folder; as with a serial loop, the
+    # last story for a folder is the one left on disk
+    by_dir: Dict[str, Dict[str, Any]] = {}
     for story in stories.get("stories", []):
-        story_id = story.get("id", "S0000")
-        story_dir = letters_dir / story_id
-        story_dir.mkdir(exist_ok=True)
-        
-        # Save metadata
-        with open(story_dir / "meta.json", "w", encoding="utf-8") as f:
-            json.dump(story, f, ensure_ascii=False, indent=2)
-        
-        # Save assembled text
-        assembled_text = story.get("assembled_text", "")
-        with open(story_dir / "text.txt", "w", encoding="utf-8") as f:
-            f.write(assembled_text)
-        
-        # Save individual file references
-        file_refs = story.get("text_files", [])
-        with open(story_dir / "source_files.txt", "w", encoding="utf-8") as f:
-            f.write("\n".join(file_refs))
+        by_dir[story.get("id", "S0000")] = story
+    
+    if pack is None:
+        pack = len(by_dir) > PACK_MIN_STORIES
+    if pack:
+        if ensure_dirs:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        tar_path = output_dir / "letters.tar"
+        _write_story_tar(tar_path, by_dir)
+        return tar_path
+    
+    letters_dir = output_dir / "letters"
+    if ensure_dirs:
+        letters_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Story paths are joined as plain strings; a Path per file adds up over
+    # thousands of stories
+    letters = os.fspath(letters_dir)
+    if len(by_dir) <= 1:
+        for story_id, story in by_dir.items():
+            _write_story_folder(os.path.join(letters, story_id), story)
+        return letters_dir
+    
+    # Small writes are I/O-bound and release the GIL; a few threads keep the
+    # disk queue busy without thrashing the directory cache
+    with ThreadPoolExecutor(max_workers=min(STORY_WRITE_WORKERS, len(by_dir))) as ex:
+        futures = [
+            ex.submit(_write_story_folder, os.path.join(letters, story_id), story)
+            for story_id, story in by_dir.items()
+        ]
+        for future in futures:
+            future.result()
+    return letters_dir
 
 
-def process_text(text_dir: Path, output_dir: Path, skip_existing: bool = False) -> None:
-    """Process all text files and assemble into stories."""
-    output_dir.mkdir(parents=True, exist_ok=True)
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for budget checks (about four characters per token)."""
+    return len(text) // 4
+
+
+def extract_and_assemble_fused(
+    text_paths: List[Path],
+    client,
+    save_per_file: bool = True,
+) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Extract and assemble a small set of text files with one Gemini call.
     
-    # Get API key (should already be loaded by main() via load_dotenv())
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set", file=sys.stderr)
-        print("Make sure .env file exists with GEMINI_API_KEY=your-key", file=sys.stderr)
-        sys.exit(1)
+    Returns (extractions in input order, story assembly), or None when the files
+    exceed FUSED_CALL_TOKEN_BUDGET or the reply cannot be used, in which case the
+    caller runs the regular two-phase flow.
+    """
+    texts = []
+    for text_path in text_paths:
+        try:
+            texts.append(_read_text_file(text_path))
+        except Exception:
+            return None
+    if sum(_estimate_tokens(text) for text in texts) > FUSED_CALL_TOKEN_BUDGET:
+        return None
     
-    # Strip whitespace in case .env has extra spaces
-    api_key = api_key.strip()
+    file_parts = [
+        types.Part.from_text(text=f"=== FILE: {path.name} ===\n{text}\n=== FILE END ===")
+        for path, text in zip(text_paths, texts)
+    ]
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text=PROMPT_FUSED_RUN),
+                types.Part.from_text(text="EXTRACTION INSTRUCTIONS:"),
+                _PROMPT_TEXT_PART,
+                types.Part.from_text(text="STORY ASSEMBLY INSTRUCTIONS:"),
+                _PROMPT_STORY_PART,
+                *file_parts,
+            ]
+        )
+    ]
+    
+    cfg = types.GenerateContentConfig(
+        temperature=0.3,
+        response_mime_type="application/json",
+        max_output_tokens=65536,
+        thinking_config=types.ThinkingConfig(thinking_budget=1024),
+    )
     
-    # Verify key format (should start with AIzaSy)
-    if not api_key.startswith("AIzaSy"):
-        print(f"Warning: API key format looks unusual (starts with: {api_key[:6]})", file=sys.stderr)
+    parts: List[str] = []
+    tracker = JsonObjectTracker()
+    stream = None
+    try:
+        stream = client.models.generate_content_stream(
+            model=TEXT_MODEL,
+            contents=contents,
+            config=cfg,
+        )
+        for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                if tracker.feed(chunk.text):
+                    break
+    except Exception as exc:
+        print(f"  Warning: fused request failed ({exc}); using per-file extraction")
+        return None
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+    
+    match = _JSON_EXTRACT.search("".join(parts))
+    try:
+        reply = loads(match.group(0)) if match else None
+    except json.JSONDecodeError:
+        reply = None
+    extractions = reply.get("extractions") if isinstance(reply, dict) else None
+    stories = reply.get("stories") if isinstance(reply, dict) else None
+    if (
+        not isinstance(extractions, list)
+        or len(extractions) != len(text_paths)
+        or not all(isinstance(extraction, dict) for extraction in extractions)
+        or not isinstance(stories, dict)
+    ):
+        print("  Warning: fused reply did not match the expected shape; using per-file extraction")
+        return None
+    
+    results = []
+    for text_path, text, extraction in zip(text_paths, texts, extractions):
+        # Extractions are matched by position, so the file's own identity wins
+        _apply_text_identity(extraction, text_path)
+        results.append(_finish_extraction(text_path, text, extraction, save_per_file))
+    return results, stories
+
+
+TEXT_MAX_WORKERS = 32
+
+
+def _text_concurrency(concurrency: Optional[int]) -> int:
+    """Resolve the worker count: explicit value, then TEXT_CONCURRENCY, then GEMINI_PARALLEL, else 8."""
+    if concurrency is None:
+        concurrency = int(os.environ.get("TEXT_CONCURRENCY") or os.environ.get("GEMINI_PARALLEL") or 8)
+    return max(1, min(TEXT_MAX_WORKERS, concurrency))
+
+
+def process_text(
+    text_dir: Path,
+    output_dir: Path,
+    skip_existing: bool = False,
+    client=None,
+    ensure_dirs: bool = True,
+    concurrency: Optional[int] = None,
+    pack_letters: Optional[bool] = False,
+    batch_api: bool = False,
+    use_cache: bool = True,
+    fuse_small_runs: bool = False,
+) -> None:
+    """Process all text files and assemble into stories.
+    
+    Pass `client` to reuse an existing Gemini client (e.g. the one shared by run_pipeline).
+    Pass `ensure_dirs=False` when output_dir and output_dir/letters already exist.
+    Up to `concurrency` files (default: $TEXT_CONCURRENCY, $GEMINI_PARALLEL or 8)
+    are extracted at once; the shared client is safe to use from several threads.
+    `pack_letters` is passed to create_story_folders as `pack`. With `batch_api`,
+    extraction is submitted as one Gemini Batch API job (cheaper, but it can take
+    minutes to hours); retries of failed files still use streaming requests.
+    Extractions are cached under <output_dir>/.extraction_cache by file content,
+    prompt and model, so unchanged files are not sent again, unless use_cache is False.
+    Raw replies of failed extractions are kept under <output_dir>/.extraction_raw.
+    With `fuse_small_runs`, runs whose files fit FUSED_CALL_TOKEN_BUDGET are
+    extracted and assembled in a single Gemini call instead of one call per file
+    plus the assembly call.
+    """
+    if ensure_dirs:
+        output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Timeout is specified in milliseconds. Allow up to 5 minutes per file
-    # to accommodate very large transcripts without tripping API deadlines.
-    http_options = types.HttpOptions(timeout=300_000)
-    client = genai.Client(api_key=api_key, http_options=http_options)
+    if client is None:
+        # Get API key (loaded from .env by the _env import)
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("Error: GEMINI_API_KEY not set", file=sys.stderr)
+            print("Make sure .env file exists with GEMINI_API_KEY=your-key", file=sys.stderr)
+            sys.exit(1)
+        
+        # Strip whitespace in case .env has extra spaces
+        api_key = api_key.strip()
+        
+        # Verify key format (should start with AIzaSy)
+        if not api_key.startswith("AIzaSy"):
+            print(f"Warning: API key format looks unusual (starts with: {api_key[:6]})", file=sys.stderr)
+        
+        client = get_client(api_key)
     
     # Find all text files recursively, ignoring extraction error artifacts created during retries
-    all_text_files = list(text_dir.rglob("*.txt"))
-    text_files = [path for path in all_text_files if not _is_extraction_error_artifact(path)]
-    skipped_files = len(all_text_files) - len(text_files)
+    text_files: List[Path] = []
+    skipped_files = 0
+    for path in iter_files(text_dir, {".txt"}):
+        if _is_extraction_error_artifact(path):
+            skipped_files += 1
+        else:
+            text_files.append(path)
     
     if not text_files:
         print(f"No text files found in {text_dir}")
@@ -534,64 +1186,195 @@ def process_text(text_dir: Path, output_dir: Path, skip_existing: bool = False)
     if skipped_files:
         print(f"  (Skipped {skipped_files} extraction error log file(s))")
     
+    cache_dir = output_dir / ".extraction_cache" if use_cache else None
+    # Raw model replies (streaming tee files, replies that failed to parse) stay out of
+    # text_dir; the directory is only created once something is written there
+    raw_dir = output_dir / ".extraction_raw"
+    
     # Step 1: Extract content from each text file
     print("\nStep 1: Extracting content from text files...")
     text_extractions = []
     text_extractions_by_file = {}
     
     extraction_output = output_dir / "text_extractions.json"
-    if skip_existing and extraction_output.exists():
+    stories_output = output_dir / "stories_assembly.json"
+    reuse_extractions = skip_existing and extraction_output.exists()
+    text_files.sort()
+    # One chunked sha256 per file keys the extraction cache and groups duplicates
+    digests = [] if reuse_extractions else [hash_file(p, "sha256").hexdigest() for p in text_files]
+    fused = None
+    if fuse_small_runs and not (reuse_extractions or (skip_existing and stories_output.exists())):
+        fused = extract_and_assemble_fused(text_files, client, save_per_file=True)
+    
+    if fused is not None:
+        print(f"  Extracted and assembled {len(text_files)} file(s) in one request")
+        text_extractions, stories = fused
+        text_extractions_by_file = {ext["file_name"]: ext for ext in text_extractions}
+        if cache_dir is not None:
+            for digest, extraction in zip(digests, text_extractions):
+                store_cache_entry(_extraction_cache_file(cache_dir, digest), extraction)
+        _write_json(extraction_output, text_extractions)
+        print(f"  Saved extractions to {extraction_output}")
+    elif reuse_extractions:
         print(f"  Loading existing extractions from {extraction_output}")
-        with open(extraction_output, "r", encoding="utf-8") as f:
-            text_extractions = json.load(f)
-            text_extractions_by_file = {ext["file_name"]: ext for ext in text_extractions}
+        text_extractions = loads(extraction_output.read_bytes())
+        text_extractions_by_file = {ext["file_name"]: ext for ext in text_extractions}
     else:
-        for i, text_file in enumerate(sorted(text_files), 1):
-            print(f"[{i}/{len(text_files)}] Extracting: {text_file.relative_to(text_dir)}")
+        total = len(text_files)
+        
+        # Byte-identical files (rescans, forwarded copies) reuse the first extraction
+        groups: Dict[str, List[int]] = {}
+        for i, digest in enumerate(digests):
+            groups.setdefault(digest, []).append(i)
+        
+        extractions: List[Optional[Dict[str, Any]]] = [None] * total
+        
+        def _extract(members: List[int]) -> Dict[str, Any]:
+            i = members[0]
+            text_file = text_files[i]
+            print(f"[{i + 1}/{total}] Extracting: {text_file.relative_to(text_dir)}")
             # Extract and save per-file JSON (saved next to text file)
-            extraction = extract_text_content(text_file, client, save_per_file=True)
-            text_extractions.append(extraction)
-            text_extractions_by_file[extraction["file_name"]] = extraction
+            extractions[i] = extract_text_content(text_file, client, save_per_file=True, raw_dir=raw_dir)
+            store_cache_entry(_extraction_cache_file(cache_dir, digests[i]), extractions[i])
+            return extractions[i]
+        
+        def _extract_batch(pending_groups: List[List[int]]) -> List[Dict[str, Any]]:
+            paths = [text_files[members[0]] for members in pending_groups]
+            print(f"  Submitting {len(paths)} file(s) as one Gemini batch job...")
+            results = extract_text_batch(paths, client, save_per_file=True, raw_dir=raw_dir)
+            for members, extraction in zip(pending_groups, results):
+                extractions[members[0]] = extraction
+                store_cache_entry(_extraction_cache_file(cache_dir, digests[members[0]]), extraction)
+            return results
+        
+        duplicates = 0
+        cached = 0
+        
+        def _settle(members: List[int], extraction: Dict[str, Any]) -> Optional[List[int]]:
+            """Share a group's extraction with its duplicates; return the members left to retry."""
+            nonlocal duplicates
+            if "error" in extraction:
+                return members[1:] or None
+            for j in members[1:]:
+                print(f"[{j + 1}/{total}] Duplicate of {extraction['file_name']}: {text_files[j].relative_to(text_dir)}")
+                extractions[j] = _reuse_duplicate_extraction(extraction, text_files[j])
+                duplicates += 1
+            return None
+        
+        # Unchanged files are recalled from the content-addressed cache without a Gemini call
+        pending: List[List[int]] = []
+        for digest, members in groups.items():
+            i = members[0]
+            hit = _read_cached_extraction(_extraction_cache_file(cache_dir, digest), text_files[i])
+            if hit is None:
+                pending.append(members)
+                continue
+            print(f"[{i + 1}/{total}] Cached: {text_files[i].relative_to(text_dir)}")
+            extractions[i] = hit
+            cached += 1
+            _settle(members, hit)
+        
+        # Each extraction is one network-bound Gemini call, so overlap them in threads;
+        # the pool size is also the cap on requests in flight. When an extraction
+        # fails, the next copy in its duplicate group is extracted in a later round.
+        max_workers = max(1, min(_text_concurrency(concurrency), len(pending)))
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            round_results = None
+            if batch_api and pending:
+                try:
+                    round_results = _extract_batch(pending)
+                except Exception as exc:
+                    print(f"  Warning: batch job failed ({exc}); falling back to streaming requests")
+            while pending:
+                if round_results is None:
+                    round_results = ex.map(_extract, pending)
+                retry = []
+                for members, extraction in zip(pending, round_results):
+                    remaining = _settle(members, extraction)
+                    if remaining:
+                        retry.append(remaining)
+                pending = retry
+                round_results = None
+        
+        if cached:
+            print(f"  Recalled {cached} unchanged file(s) from {cache_dir}")
+        text_extractions = extractions
+        text_extractions_by_file = {ext["file_name"]: ext for ext in text_extractions}
+        
+        if duplicates:
+            print(f"  Reused extractions for {duplicates} duplicate file(s)")
         
         # Save extractions
-        with open(extraction_output, "w", encoding="utf-8") as f:
-            json.dump(text_extractions, f, ensure_ascii=False, indent=2)
+        _write_json(extraction_output, text_extractions)
         print(f"  Saved extractions to {extraction_output}")
     
     # Step 2: Assemble stories
     print("\nStep 2: Assembling stories from text files...")
-    stories_output = output_dir / "stories_assembly.json"
-    if skip_existing and stories_output.exists():
+    if fused is not None:
+        _write_json(stories_output, stories)
+        print(f"  Saved stories to {stories_output}")
+    elif skip_existing and stories_output.exists():
         print(f"  Loading existing stories from {stories_output}")
-        with open(stories_output, "r", encoding="utf-8") as f:
-            stories = json.load(f)
+        stories = loads(stories_output.read_bytes())
     else:
         stories = assemble_stories(text_extractions, client)
-        with open(stories_output, "w", encoding="utf-8") as f:
-            json.dump(stories, f, ensure_ascii=False, indent=2)
+        _write_json(stories_output, stories)
         print(f"  Saved stories to {stories_output}")
     
     # Step 3: Create letters/ folder structure
     print("\nStep 3: Creating letters/ folder structure...")
-    create_story_folders(stories, output_dir, text_extractions_by_file)
+    letters_output = create_story_folders(
+        stories, output_dir, text_extractions_by_file, ensure_dirs, pack=pack_letters
+    )
     
     print("\nTEXT processing complete.")
     print("  - Per-file extractions: JSON files saved alongside text files (*_extraction.json)")
     print(f"  - Aggregated extractions: {extraction_output}")
     print(f"  - Stories assembly: {stories_output}")
-    print(f"  - Letters folder: {output_dir / 'letters'}")
+    print(f"  - Letters: {letters_output}")
 
 
 if __name__ == "__main__":
-    # Load .env from current directory or parent directory
-    script_dir = Path(__file__).parent.absolute()
-    load_dotenv()  # Try current directory first
-    load_dotenv(dotenv_path=script_dir.parent / ".env")  # Try parent directory
     ap = argparse.ArgumentParser(description="Process text files from TEXT directory")
     ap.add_argument("--text-dir", type=Path, required=True)
     ap.add_argument("--output-dir", type=Path, required=True)
     ap.add_argument("--skip-existing", action="store_true")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        help="Text files extracted in parallel (default: $TEXT_CONCURRENCY, $GEMINI_PARALLEL or 8)",
+    )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not write the on-disk extraction cache",
+    )
+    ap.add_argument(
+        "--fuse-small-runs",
+        action="store_true",
+        help=f"Extract and assemble in one request when the files fit ~{FUSED_CALL_TOKEN_BUDGET} tokens",
+    )
+    ap.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit text extraction as one Gemini Batch API job instead of streaming requests",
+    )
+    ap.add_argument(
+        "--pack-letters",
+        choices=("never", "auto", "always"),
+        default="never",
+        help=f"Write letters.tar instead of letters/ folders (auto: above {PACK_MIN_STORIES} stories)",
+    )
     args = ap.parse_args()
     
-    process_text(args.text_dir, args.output_dir, args.skip_existing)
+    process_text(
+        args.text_dir,
+        args.output_dir,
+        args.skip_existing,
+        concurrency=args.concurrency,
+        pack_letters={"never": False, "auto": None, "always": True}[args.pack_letters],
+        batch_api=args.batch_api,
+        use_cache=not args.no_cache,
+        fuse_small_runs=args.fuse_small_runs,
+    )
 
@@ -18,13 +18,19 @@ from __future__ import annotations
 import os
 import sys
 import argparse
-import subprocess
-from dotenv import load_dotenv
+from typing import Callable
+import _env  # noqa: F401  (loads .env once)
+from _common import get_client
 
+# Both stages run in-process so they share one interpreter and one Gemini client
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from llm_group_letters import main as group_main
+from translate_letters import main as translate_main
 
-def run(cmd: list[str]) -> None:
-    print("$", " ".join(cmd))
-    subprocess.run(cmd, check=True)
+
+def run(step: Callable[..., None], argv: list[str], client) -> None:
+    print("$", step.__module__, " ".join(argv))
+    step(argv, client=client)
 
 
 def main() -> None:
@@ -41,12 +47,10 @@ def main() -> None:
     ap.add_argument("--letters-dir", help="Letters output dir; defaults to <base>/letters")
     ap.add_argument("--no-latex", action="store_true", help="Skip LaTeX generation for English translations")
     ap.add_argument("--force-translate", action="store_true", help="Re-translate even if en.txt exists")
+    ap.add_argument("--batch-translate", action="store_true", help="Pack several short letters into each translation request")
     ap.add_argument("--save-input", action="store_true", help="Save LLM input listing", default=True)
     args = ap.parse_args()
 
-    # Load .env so GEMINI_API_KEY is available when set there
-    load_dotenv()
-
     base = args.base.rstrip("/\\")
     base_name = os.path.basename(base)
 
@@ -54,19 +58,20 @@ def main() -> None:
     german_dir = args.text_dir or os.path.join(base, "german_output")
     letters_dir = args.letters_dir or os.path.join(base, "letters")
 
-    # Ensure API key exists
-    if not os.environ.get("GEMINI_API_KEY"):
-        print("Error: GEMINI_API_KEY not set (set it or add it to .env)", file=sys.stderr)
+    # Check the key before building the client, with the message the per-step
+    # scripts print when run on their own
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("GEMINI_API_KEY not set", file=sys.stderr)
         sys.exit(1)
 
     os.makedirs(german_dir, exist_ok=True)
     os.makedirs(letters_dir, exist_ok=True)
 
-    py = sys.executable
+    client = get_client(api_key)
 
     # Step 1: OCR (missing) + LLM grouping + assemble de.txt
     cmd_group = [
-        py, "llm_group_letters.py",
         "--images-dir", images_dir,
         "--text-dir", german_dir,
         "--output-dir", letters_dir,
@@ -75,18 +80,20 @@ def main() -> None:
     ]
     if args.save_input:
         cmd_group.append("--save-input")
-    run(cmd_group)
+    run(group_main, cmd_group, client)
 
     # Step 2: Translate assembled letters
     cmd_translate = [
-        py, "translate_letters.py",
         "--letters-dir", letters_dir,
+        "--cache-dir", os.path.join(base, ".translate_cache"),
     ]
     if not args.no_latex:
         cmd_translate.append("--latex")
     if args.force_translate:
         cmd_translate.append("--force")
-    run(cmd_translate)
+    if args.batch_translate:
+        cmd_translate.append("--batch")
+    run(translate_main, cmd_translate, client)
 
     print("All done.")
 
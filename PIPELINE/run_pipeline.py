@@ -16,16 +16,35 @@ from __future__ import annotations
 
 import os
 import sys
+import logging
 import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Import processing modules
+# Processing modules are imported on first use of a stage (see __getattr__),
+# so --help and single-stage runs skip pandas/PIL/genai imports they don't need.
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from process_natives import process_natives
-from process_images import process_images
-from process_text import process_text
+
+import _env  # noqa: F401  (loads .env once)
+
+# Each stage function lives in the module of the same name
+_STAGES = frozenset({"process_natives", "process_images", "process_text"})
+
+
+def __getattr__(name: str):
+    """Import a stage function the first time it is looked up on this module."""
+    if name not in _STAGES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    stage = getattr(importlib.import_module(name), name)
+    globals()[name] = stage
+    return stage
+
+
+def _stage(name: str):
+    """Resolve a stage function through the module, so patched attributes win."""
+    return getattr(sys.modules[__name__], name)
 
 
 def _guess_default_base_dir(script_dir: Path) -> Path:
@@ -37,24 +56,36 @@ def _guess_default_base_dir(script_dir: Path) -> Path:
         script_dir.parent / "PIPELINE",
         script_dir.parent / "pipeline",
     ]
+    markers = {"TEXT", "IMAGES", "NATIVES"}
     for candidate in candidates:
-        if candidate.exists() and any((candidate / subdir).exists() for subdir in ("TEXT", "IMAGES", "NATIVES")):
-            return candidate
+        # One directory listing per candidate instead of an exists() probe per marker
+        try:
+            with os.scandir(candidate) as entries:
+                if any(entry.name in markers for entry in entries):
+                    return candidate
+        except OSError:
+            continue
     return script_dir
 
 
+def _run_stages_concurrently(stages) -> None:
+    """Run independent stages on one thread each and wait for all of them.
+    
+    A failing stage does not cancel the others; the first failure is re-raised
+    once every stage has finished.
+    """
+    with ThreadPoolExecutor(max_workers=len(stages)) as ex:
+        futures = [ex.submit(run) for run in stages]
+    for future in futures:
+        exc = future.exception()
+        if exc is not None:
+            raise exc
+
+
 def main() -> None:
-    # Load .env from script directory or parent directory
+    # Processor warnings/errors go through logging; print them as plain stderr lines
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
     script_dir = Path(__file__).parent.absolute()
-    # Try script directory first (where .env actually is)
-    env_path = script_dir / ".env"
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path)
-    else:
-        # Fallback to parent directory
-        load_dotenv(dotenv_path=script_dir.parent / ".env")
-        # Also try default location
-        load_dotenv()
     
     ap = argparse.ArgumentParser(
         description="House Oversight Pipeline: Process NATIVES, IMAGES, and TEXT directories"
@@ -65,14 +96,9 @@ def main() -> None:
         default="all",
         help="Which processing stage to run (default: all)"
     )
-    # Default base_dir to the detected project root, even if this script lives in /batch7
-    script_dir = Path(__file__).parent.absolute()
-    default_base_dir = _guess_default_base_dir(script_dir)
-    
     ap.add_argument(
         "--base-dir",
-        default=str(default_base_dir),
-        help=f"Base directory containing NATIVES/, IMAGES/, TEXT/ (default: {default_base_dir})"
+        help="Base directory containing NATIVES/, IMAGES/, TEXT/ (default: detected project root)"
     )
     ap.add_argument(
         "--natives-dir",
@@ -109,9 +135,44 @@ def main() -> None:
         type=int,
         help="Limit number of files to process in each category"
     )
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="Images (and Excel workbooks and text files, capped at 32) analyzed in parallel (default: 10)"
+    )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not write the on-disk OCR (images) and extraction (text) caches"
+    )
+    ap.add_argument(
+        "--no-preprocess",
+        action="store_true",
+        help="Upload original images without downscaling/recompressing them first"
+    )
+    ap.add_argument(
+        "--image-batch-size",
+        type=int,
+        default=1,
+        help="Images analyzed per Gemini request; >1 shares the prompt across images (default: 1)"
+    )
+    ap.add_argument(
+        "--text-batch-api",
+        action="store_true",
+        help="Submit text extraction as one Gemini Batch API job instead of streaming requests"
+    )
+    ap.add_argument(
+        "--parallel-stages",
+        action="store_true",
+        help="Run the selected stages at the same time; each keeps its own --concurrency, "
+             "so up to three times as many Gemini requests are in flight"
+    )
     args = ap.parse_args()
 
-    base_dir = Path(args.base_dir)
+    # Only probe for the project root when nothing more specific was given,
+    # even if this script lives in /batch7
+    base_dir = Path(args.base_dir) if args.base_dir else None
     if args.batch:
         workspace_root = script_dir.parent
         batch_dir = workspace_root / args.batch
@@ -125,11 +186,13 @@ def main() -> None:
         source_path = Path(args.source)
         if source_path.exists():
             base_dir = source_path
-        elif (Path(args.base_dir) / args.source).exists():
-            base_dir = Path(args.base_dir) / args.source
+        else:
+            root = base_dir or _guess_default_base_dir(script_dir)
+            base_dir = root / args.source if (root / args.source).exists() else root
+    if base_dir is None:
+        base_dir = _guess_default_base_dir(script_dir)
     
     output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
 
     # Set up directory paths
     natives_dir = Path(args.natives_dir) if args.natives_dir else base_dir / "NATIVES"
@@ -141,37 +204,91 @@ def main() -> None:
         print("Error: GEMINI_API_KEY not set (set it or add it to .env)", file=sys.stderr)
         sys.exit(1)
 
+    # Imported here rather than at the top so --help does not pay for genai/httpx
+    from _common import get_client
+    client = get_client(os.environ["GEMINI_API_KEY"])
+
     process_natives_flag = args.process in ("natives", "all")
     process_images_flag = args.process in ("images", "all")
     process_text_flag = args.process in ("text", "all")
+    
+    # Create every output directory the selected stages write to up front, so
+    # the processors can skip their own mkdir calls (ensure_dirs=False)
+    output_subdirs = [output_dir]
+    if process_images_flag:
+        output_subdirs.append(output_dir / "images_analysis")
+    if process_text_flag:
+        output_subdirs.append(output_dir / "text_analysis" / "letters")
+    for sub in output_subdirs:
+        sub.mkdir(parents=True, exist_ok=True)
 
-    if process_natives_flag:
+    def _run_natives() -> None:
         print("=" * 80)
         print("PROCESSING NATIVES (Excel Spreadsheets)")
         print("=" * 80)
         if natives_dir.exists():
-            process_natives(natives_dir, output_dir / "natives_analysis", args.skip_existing)
+            _stage("process_natives")(
+                natives_dir,
+                output_dir / "natives_analysis",
+                args.skip_existing,
+                client=client,
+                concurrency=args.concurrency,
+            )
         else:
             print(f"NATIVES directory not found: {natives_dir}")
 
-    if process_images_flag:
+    def _run_images() -> None:
         print("\n" + "=" * 80)
         print("PROCESSING IMAGES")
         print("=" * 80)
         if images_dir.exists():
-            process_images(images_dir, output_dir / "images_analysis", args.skip_existing, args.limit)
+            _stage("process_images")(
+                images_dir,
+                output_dir / "images_analysis",
+                args.skip_existing,
+                args.limit,
+                args.concurrency,
+                use_cache=not args.no_cache,
+                client=client,
+                preprocess=not args.no_preprocess,
+                ensure_dirs=False,
+                batch_size=args.image_batch_size,
+            )
         else:
             print(f"IMAGES directory not found: {images_dir}")
 
-    if process_text_flag:
+    def _run_text() -> None:
         print("\n" + "=" * 80)
         print("PROCESSING TEXT")
         print("=" * 80)
         if text_dir.exists():
-            process_text(text_dir, output_dir / "text_analysis", args.skip_existing)
+            _stage("process_text")(
+                text_dir,
+                output_dir / "text_analysis",
+                args.skip_existing,
+                client=client,
+                ensure_dirs=False,
+                concurrency=args.concurrency,
+                batch_api=args.text_batch_api,
+                use_cache=not args.no_cache,
+            )
         else:
             print(f"TEXT directory not found: {text_dir}")
 
+    stages = []
+    if process_natives_flag:
+        stages.append(_run_natives)
+    if process_images_flag:
+        stages.append(_run_images)
+    if process_text_flag:
+        stages.append(_run_text)
+
+    if args.parallel_stages and len(stages) > 1:
+        _run_stages_concurrently(stages)
+    else:
+        for run in stages:
+            run()
+
     print("\n" + "=" * 80)
     print("PIPELINE COMPLETE")
     print("=" * 80)
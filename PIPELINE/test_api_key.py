@@ -1,15 +1,10 @@
 #!/usr/bin/env python3
 """Test if API key works with Gemini."""
-from dotenv import load_dotenv
 import os
-from pathlib import Path
+import _env  # noqa: F401  (loads .env once)
 from google import genai
 from google.genai import types
 
-script_dir = Path(__file__).parent.absolute()
-env_path = script_dir / ".env"
-load_dotenv(dotenv_path=env_path)
-
 api_key = os.environ.get("GEMINI_API_KEY", "").strip()
 print(f"Testing API key (length: {len(api_key)})...")
 
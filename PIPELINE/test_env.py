@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 """Test if .env file is being loaded correctly."""
-from dotenv import load_dotenv
 import os
-from pathlib import Path
+import _env
 
-script_dir = Path(__file__).parent.absolute()
-env_path = script_dir / ".env"
+script_dir = _env.SCRIPT_DIR
+env_path = _env.ENV_PATH
 
 print(f"Script directory: {script_dir}")
 print(f"Looking for .env at: {env_path}")
 print(f".env exists: {env_path.exists()}")
 
 if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
     key = os.environ.get("GEMINI_API_KEY", "")
     print(f"\nAPI Key loaded: {len(key) > 0}")
     print(f"Key length: {len(key)}")
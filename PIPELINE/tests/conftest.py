@@ -1,16 +1,26 @@
 """
 Pytest configuration and shared fixtures for BATCH7 pipeline tests.
 """
+import io
 import os
+import sys
 import json
 import tempfile
 import shutil
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 from unittest.mock import Mock, MagicMock
 import pytest
 from PIL import Image
 import pandas as pd
 
+# Make the pipeline modules importable once for every test module
+_PIPELINE_DIR = str(Path(__file__).resolve().parent.parent)
+if _PIPELINE_DIR not in sys.path:
+    sys.path.insert(0, _PIPELINE_DIR)
+
+import _common  # noqa: E402
+
 
 # ============================================================================
 # DIRECTORY FIXTURES
@@ -24,9 +34,13 @@ def temp_dir():
     shutil.rmtree(temp_path, ignore_errors=True)
 
 
-@pytest.fixture
-def mock_batch7_structure(temp_dir):
-    """Create a mock BATCH7 directory structure."""
+@pytest.fixture(scope='session')
+def mock_batch7_structure(tmp_path_factory):
+    """Create a mock BATCH7 directory structure once per session.
+    
+    Tests only read these paths (the processors are patched), so one tree is shared.
+    """
+    temp_dir = tmp_path_factory.mktemp('batch7')
     structure = {
         'NATIVES': temp_dir / 'NATIVES',
         'IMAGES': temp_dir / 'IMAGES' / '001',
@@ -40,7 +54,7 @@ def mock_batch7_structure(temp_dir):
     for path in structure.values():
         path.mkdir(parents=True, exist_ok=True)
 
-    return structure
+    return MappingProxyType(structure)
 
 
 # ============================================================================
@@ -60,18 +74,50 @@ def sample_excel_data():
 
 @pytest.fixture
 def sample_excel_file(temp_dir, sample_excel_data):
-    """Create a sample Excel file."""
+    """Create a sample Excel file with xlsxwriter.
+    
+    constant_memory is left off: pandas writes cells column by column, and
+    xlsxwriter's row-streaming mode drops cells written to an already flushed row.
+    """
     excel_path = temp_dir / 'sample_document.xlsx'
-    sample_excel_data.to_excel(excel_path, index=False, engine='openpyxl')
+    sample_excel_data.to_excel(excel_path, index=False, engine='xlsxwriter')
     return excel_path
 
 
+@pytest.fixture(scope='session')
+def make_xlsx():
+    """Factory writing rows straight into a write-only openpyxl workbook.
+    
+    Pass a list of rows for a single "Sheet1", or a dict of sheet name -> rows.
+    """
+    from openpyxl import Workbook
+
+    def _make(path, rows):
+        sheets = rows if isinstance(rows, dict) else {'Sheet1': rows}
+        wb = Workbook(write_only=True)
+        for name, sheet_rows in sheets.items():
+            ws = wb.create_sheet(title=name)
+            for row in sheet_rows:
+                ws.append(list(row))
+        wb.save(path)
+        return path
+
+    return _make
+
+
+@pytest.fixture(scope='session')
+def _base_image_bytes():
+    """Encode the sample JPEG once per session."""
+    buf = io.BytesIO()
+    Image.new('RGB', (1, 1), color='white').save(buf, format='JPEG')
+    return buf.getvalue()
+
+
 @pytest.fixture
-def sample_image_file(temp_dir):
+def sample_image_file(temp_dir, _base_image_bytes):
     """Create a sample image file."""
     img_path = temp_dir / 'HOUSE_OVERSIGHT_010477.jpg'
-    img = Image.new('RGB', (800, 600), color='white')
-    img.save(img_path)
+    img_path.write_bytes(_base_image_bytes)
     return img_path
 
 
@@ -99,10 +145,10 @@ def sample_text_file(temp_dir):
 # LLM MOCK FIXTURES
 # ============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def mock_llm_response_natives():
     """Mock LLM response for natives (Excel) processing."""
-    return {
+    return MappingProxyType({
         "structure_analysis": {
             "num_worksheets": 1,
             "worksheet_names": ["Sheet1"],
@@ -164,13 +210,13 @@ def mock_llm_response_natives():
             "processing_date": "2024-01-15",
             "HOUSE_OVERSIGHT_IDs": ["HOUSE_OVERSIGHT_010477", "HOUSE_OVERSIGHT_010478", "HOUSE_OVERSIGHT_010479"]
         }
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def mock_llm_response_images():
     """Mock LLM response for image processing."""
-    return {
+    return MappingProxyType({
         "ocr_extraction": {
             "typed_text": "HOUSE OVERSIGHT COMMITTEE\nDocument Number: HOUSE_OVERSIGHT_010477",
             "handwritten_text": "Signature: John Doe",
@@ -205,13 +251,13 @@ def mock_llm_response_images():
             "processing_date": "2024-01-15",
             "HOUSE_OVERSIGHT_ID": "HOUSE_OVERSIGHT_010477"
         }
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def mock_llm_response_text():
     """Mock LLM response for text processing."""
-    return {
+    return MappingProxyType({
         "content_extraction": {
             "main_text": "This is a sample document for testing purposes.",
             "metadata": {
@@ -237,13 +283,13 @@ def mock_llm_response_text():
             "processing_date": "2024-01-15",
             "HOUSE_OVERSIGHT_ID": "HOUSE_OVERSIGHT_010477"
         }
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def mock_llm_response_grouping():
     """Mock LLM response for text grouping."""
-    return {
+    return MappingProxyType({
         "stories": [
             {
                 "story_id": "S0001",
@@ -255,7 +301,31 @@ def mock_llm_response_grouping():
                 "confidence": 0.9
             }
         ]
-    }
+    })
+
+
+@pytest.fixture(scope='session')
+def mock_llm_response_natives_json(mock_llm_response_natives):
+    """mock_llm_response_natives serialized once per session."""
+    return json.dumps(dict(mock_llm_response_natives))
+
+
+@pytest.fixture(scope='session')
+def mock_llm_response_images_json(mock_llm_response_images):
+    """mock_llm_response_images serialized once per session."""
+    return json.dumps(dict(mock_llm_response_images))
+
+
+@pytest.fixture(scope='session')
+def mock_llm_response_text_json(mock_llm_response_text):
+    """mock_llm_response_text serialized once per session."""
+    return json.dumps(dict(mock_llm_response_text))
+
+
+@pytest.fixture(scope='session')
+def mock_llm_response_grouping_json(mock_llm_response_grouping):
+    """mock_llm_response_grouping serialized once per session."""
+    return json.dumps(dict(mock_llm_response_grouping))
 
 
 @pytest.fixture
@@ -273,6 +343,28 @@ def mock_gemini_client():
     return mock_client
 
 
+@pytest.fixture(scope='module')
+def make_mock_client():
+    """Factory for a Gemini client mock that uploads files and streams one response.
+    
+    `response` may be a dict (serialized to JSON) or a raw response string.
+    """
+    def _make(response):
+        text = response if isinstance(response, str) else json.dumps(response)
+        client = Mock()
+        client.files.upload.return_value = SimpleNamespace(uri="file://test", mime_type="image/jpeg")
+        client.models.generate_content_stream.return_value = [SimpleNamespace(text=text)]
+        return client
+    return _make
+
+
+@pytest.fixture(autouse=True)
+def _clear_cached_clients():
+    """Drop the memoized Gemini clients so each test sees its own patched genai.Client."""
+    yield
+    _common.get_client.cache_clear()
+
+
 # ============================================================================
 # ENVIRONMENT FIXTURES
 # ============================================================================
@@ -382,6 +474,4 @@ def validate_json_schema(data, schema):
 
 def create_mock_llm_response(text_content):
     """Create a mock LLM response object."""
-    mock_response = Mock()
-    mock_response.text = text_content
-    return mock_response
+    return SimpleNamespace(text=text_content)
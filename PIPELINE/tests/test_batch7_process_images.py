@@ -9,15 +9,11 @@ Tests image processing functionality including:
 - Error handling and edge cases
 """
 import json
-import sys
-from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 import pytest
 from PIL import Image
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from batch7_process_images import (
     analyze_image_with_llm,
     process_single_image,
@@ -35,18 +31,16 @@ from batch7_process_images import (
 class TestAnalyzeImageWithLLM:
     """Tests for LLM image analysis."""
 
-    def test_analyze_with_valid_response(self, sample_image_file, mock_llm_response_images):
+    def test_analyze_with_valid_response(self, sample_image_file, mock_llm_response_images_json):
         """Test image analysis with valid JSON response."""
         mock_client = Mock()
 
         # Mock file upload
-        mock_file = Mock()
-        mock_file.uri = "file://test-uri"
-        mock_file.mime_type = "image/jpeg"
+        mock_file = SimpleNamespace(uri="file://test-uri", mime_type="image/jpeg")
         mock_client.files.upload.return_value = mock_file
 
         # Mock response
-        mock_stream = [Mock(text=json.dumps(mock_llm_response_images))]
+        mock_stream = [SimpleNamespace(text=mock_llm_response_images_json)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = analyze_image_with_llm(sample_image_file, mock_client)
@@ -60,10 +54,10 @@ class TestAnalyzeImageWithLLM:
         """Test that image file is uploaded."""
         mock_client = Mock()
 
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
+        mock_file = SimpleNamespace(uri="file://test", mime_type="image/jpeg")
         mock_client.files.upload.return_value = mock_file
 
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.jpg"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         analyze_image_with_llm(sample_image_file, mock_client)
@@ -77,10 +71,10 @@ class TestAnalyzeImageWithLLM:
         """Test that correct model is used for vision."""
         mock_client = Mock()
 
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
+        mock_file = SimpleNamespace(uri="file://test", mime_type="image/jpeg")
         mock_client.files.upload.return_value = mock_file
 
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.jpg"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         analyze_image_with_llm(sample_image_file, mock_client)
@@ -88,34 +82,24 @@ class TestAnalyzeImageWithLLM:
         call_args = mock_client.models.generate_content_stream.call_args
         assert call_args.kwargs['model'] == 'gemini-2.5-pro'
 
-    def test_analyze_extracts_house_oversight_id(self, temp_dir):
+    def test_analyze_extracts_house_oversight_id(self, temp_dir, make_mock_client):
         """Test extraction of HOUSE_OVERSIGHT ID from filename."""
         img_path = temp_dir / "HOUSE_OVERSIGHT_010477.jpg"
-        img = Image.new('RGB', (100, 100))
+        img = Image.new('RGB', (1, 1))
         img.save(img_path)
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": "test.jpg", "image_analysis": {}}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         result = analyze_image_with_llm(img_path, mock_client)
 
         assert "house_oversight_id" in result
         assert result["house_oversight_id"] == "010477"
 
-    def test_analyze_adds_processing_metadata(self, sample_image_file):
+    def test_analyze_adds_processing_metadata(self, sample_image_file, make_mock_client):
         """Test that processing metadata is added."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": "test.jpg"}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         result = analyze_image_with_llm(sample_image_file, mock_client)
 
@@ -124,29 +108,19 @@ class TestAnalyzeImageWithLLM:
         assert "model" in result["processing_metadata"]
         assert result["processing_metadata"]["model"] == "gemini-2.5-pro"
 
-    def test_analyze_with_markdown_json(self, sample_image_file):
+    def test_analyze_with_markdown_json(self, sample_image_file, make_mock_client):
         """Test handling of markdown-wrapped JSON response."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": "test.jpg", "image_analysis": {}}
         markdown_response = f"```json\n{json.dumps(response)}\n```"
-        mock_stream = [Mock(text=markdown_response)]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(markdown_response)
 
         result = analyze_image_with_llm(sample_image_file, mock_client)
 
         assert result["file_name"] == "test.jpg"
 
-    def test_analyze_with_invalid_json(self, sample_image_file, capsys):
+    def test_analyze_with_invalid_json(self, sample_image_file, capsys, make_mock_client):
         """Test handling of invalid JSON response."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
-        mock_stream = [Mock(text="This is not valid JSON")]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client("This is not valid JSON")
 
         result = analyze_image_with_llm(sample_image_file, mock_client)
 
@@ -168,15 +142,15 @@ class TestAnalyzeImageWithLLM:
     def test_analyze_streaming_response(self, sample_image_file):
         """Test handling of chunked streaming response."""
         mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
+        mock_file = SimpleNamespace(uri="file://test", mime_type="image/jpeg")
         mock_client.files.upload.return_value = mock_file
 
         response = {"file_name": "test.jpg", "image_analysis": {}}
         json_str = json.dumps(response)
 
         # Split into chunks
-        chunk1 = Mock(text=json_str[:len(json_str)//2])
-        chunk2 = Mock(text=json_str[len(json_str)//2:])
+        chunk1 = SimpleNamespace(text=json_str[:len(json_str)//2])
+        chunk2 = SimpleNamespace(text=json_str[len(json_str)//2:])
 
         mock_client.models.generate_content_stream.return_value = [chunk1, chunk2]
 
@@ -187,13 +161,13 @@ class TestAnalyzeImageWithLLM:
     def test_analyze_with_empty_chunks(self, sample_image_file):
         """Test handling of empty chunks in stream."""
         mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
+        mock_file = SimpleNamespace(uri="file://test", mime_type="image/jpeg")
         mock_client.files.upload.return_value = mock_file
 
         response = {"file_name": "test.jpg"}
-        chunk1 = Mock(text=None)
-        chunk2 = Mock(text=json.dumps(response))
-        chunk3 = Mock(text=None)
+        chunk1 = SimpleNamespace(text=None)
+        chunk2 = SimpleNamespace(text=json.dumps(response))
+        chunk3 = SimpleNamespace(text=None)
 
         mock_client.models.generate_content_stream.return_value = [chunk1, chunk2, chunk3]
 
@@ -201,14 +175,9 @@ class TestAnalyzeImageWithLLM:
 
         assert result["file_name"] == "test.jpg"
 
-    def test_analyze_includes_prompt(self, sample_image_file):
+    def test_analyze_includes_prompt(self, sample_image_file, make_mock_client):
         """Test that analysis includes the prompt."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
 
         analyze_image_with_llm(sample_image_file, mock_client)
 
@@ -218,7 +187,7 @@ class TestAnalyzeImageWithLLM:
         # Should have both image and text prompt
         assert len(contents[0].parts) == 2
 
-    def test_analyze_sets_relative_file_path(self, temp_dir):
+    def test_analyze_sets_relative_file_path(self, temp_dir, make_mock_client):
         """Test that file_path is set as relative path."""
         # Create nested structure
         batch_dir = temp_dir / "BATCH7"
@@ -226,16 +195,11 @@ class TestAnalyzeImageWithLLM:
         images_dir.mkdir(parents=True)
 
         img_path = images_dir / "test.jpg"
-        img = Image.new('RGB', (100, 100))
+        img = Image.new('RGB', (1, 1))
         img.save(img_path)
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": "test.jpg"}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         result = analyze_image_with_llm(img_path, mock_client)
 
@@ -252,15 +216,10 @@ class TestAnalyzeImageWithLLM:
 class TestProcessSingleImage:
     """Tests for single image processing."""
 
-    def test_process_creates_json_output(self, sample_image_file):
+    def test_process_creates_json_output(self, sample_image_file, make_mock_client):
         """Test that processing creates JSON output file."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": sample_image_file.name, "image_analysis": {}}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         process_single_image(sample_image_file, mock_client, skip_existing=False)
 
@@ -273,15 +232,10 @@ class TestProcessSingleImage:
             data = json.load(f)
         assert "file_name" in data
 
-    def test_process_output_location(self, sample_image_file):
+    def test_process_output_location(self, sample_image_file, make_mock_client):
         """Test that output is in same directory as image."""
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": sample_image_file.name}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         process_single_image(sample_image_file, mock_client, skip_existing=False)
 
@@ -307,18 +261,13 @@ class TestProcessSingleImage:
             data = json.load(f)
         assert data == {"existing": True}
 
-    def test_process_overwrites_when_not_skipping(self, sample_image_file):
+    def test_process_overwrites_when_not_skipping(self, sample_image_file, make_mock_client):
         """Test that existing files are overwritten when not skipping."""
         output_file = sample_image_file.parent / f"{sample_image_file.stem}.json"
         output_file.write_text('{"existing": true}')
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {"file_name": sample_image_file.name, "new": True}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         process_single_image(sample_image_file, mock_client, skip_existing=False)
 
@@ -327,7 +276,7 @@ class TestProcessSingleImage:
             data = json.load(f)
         assert "new" in data
 
-    def test_process_error_handling(self, sample_image_file, capsys):
+    def test_process_error_handling(self, sample_image_file, caplog):
         """Test error handling during processing."""
         mock_client = Mock()
         mock_client.files.upload.side_effect = Exception("Upload error")
@@ -335,23 +284,17 @@ class TestProcessSingleImage:
         # Should not raise
         process_single_image(sample_image_file, mock_client, skip_existing=False)
 
-        captured = capsys.readouterr()
-        assert "ERROR" in captured.err
+        assert any(record.levelname == "ERROR" for record in caplog.records)
 
-    def test_process_json_encoding(self, temp_dir):
+    def test_process_json_encoding(self, temp_dir, make_mock_client):
         """Test that JSON is saved with UTF-8 encoding."""
         img_path = temp_dir / "test.jpg"
-        img = Image.new('RGB', (100, 100))
+        img = Image.new('RGB', (1, 1))
         img.save(img_path)
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         # Response with unicode characters
         response = {"file_name": "test.jpg", "text": "Café résumé"}
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
 
         process_single_image(img_path, mock_client, skip_existing=False)
 
@@ -375,8 +318,8 @@ class TestProcessImages:
         with pytest.raises(SystemExit):
             process_images(temp_dir, temp_dir, skip_existing=False)
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_finds_image_files(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_finds_image_files(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test that process_images finds all image files."""
         # Create test images
         (temp_dir / "file1.jpg").touch()
@@ -384,11 +327,7 @@ class TestProcessImages:
         (temp_dir / "file3.tiff").touch()
         (temp_dir / "file4.txt").touch()  # Not an image
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image') as mock_process:
@@ -397,19 +336,15 @@ class TestProcessImages:
             # Should find 3 image files, not txt
             assert mock_process.call_count == 3
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_finds_images_recursively(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_finds_images_recursively(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test that images are found in subdirectories."""
         (temp_dir / "file1.jpg").touch()
         subdir = temp_dir / "subdir"
         subdir.mkdir()
         (subdir / "file2.jpg").touch()
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image') as mock_process:
@@ -417,7 +352,7 @@ class TestProcessImages:
 
             assert mock_process.call_count == 2
 
-    @patch('batch7_process_images.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_no_files(self, mock_genai, temp_dir, mock_env_with_api_key, capsys):
         """Test behavior when no image files found."""
         mock_client = Mock()
@@ -428,8 +363,8 @@ class TestProcessImages:
         captured = capsys.readouterr()
         assert "No image files found" in captured.out
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_creates_output_dir(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_creates_output_dir(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test that output directory is created."""
         images_dir = temp_dir / "images"
         images_dir.mkdir()
@@ -437,11 +372,7 @@ class TestProcessImages:
 
         output_dir = temp_dir / "output"
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image'):
@@ -449,16 +380,12 @@ class TestProcessImages:
 
         assert output_dir.exists()
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_skip_existing(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_skip_existing(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test skip_existing flag propagates."""
         (temp_dir / "test.jpg").touch()
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image') as mock_process:
@@ -467,35 +394,28 @@ class TestProcessImages:
             call_args = mock_process.call_args
             assert call_args.args[2] == True  # skip_existing parameter
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_creates_client(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_creates_client(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test that Gemini client is created with API key."""
         (temp_dir / "test.jpg").touch()
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image'):
             process_images(temp_dir, temp_dir, skip_existing=False)
 
-        mock_genai.assert_called_once_with(api_key='test-api-key-12345')
+        mock_genai.assert_called_once()
+        assert mock_genai.call_args.kwargs['api_key'] == 'test-api-key-12345'
 
-    @patch('batch7_process_images.genai.Client')
-    def test_process_handles_all_image_extensions(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_handles_all_image_extensions(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test that all supported image extensions are processed."""
         extensions = ['.jpg', '.jpeg', '.png', '.tif', '.tiff', '.gif', '.bmp']
         for ext in extensions:
             (temp_dir / f"file{ext}").touch()
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         with patch('batch7_process_images.process_single_image') as mock_process:
@@ -530,17 +450,95 @@ class TestConstants:
         assert "confidence" in PROMPT_IMAGE_ANALYSIS
 
 
+@pytest.mark.unit
+@pytest.mark.images
+class TestPreprocess:
+    """Tests for downscaling images before upload."""
+
+    def test_preprocess_applies_exif_orientation(self, tmp_path):
+        """A scan stored sideways with an Orientation tag is uploaded upright."""
+        import io
+        from batch7_process_images import _preprocess
+
+        image_path = tmp_path / "scan.jpg"
+        img = Image.new("RGB", (3000, 1000), (255, 255, 255))
+        exif = img.getexif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise to display
+        img.save(image_path, "JPEG", exif=exif, quality=100)
+
+        data = _preprocess(image_path)
+
+        assert data is not None
+        width, height = Image.open(io.BytesIO(data)).size
+        assert height > width
+
+
+@pytest.mark.unit
+@pytest.mark.images
+class TestOcrCacheKey:
+    """Tests for the OCR cache key and the lazily started preprocess pool."""
+
+    def test_cache_key_depends_on_preprocessing(self, tmp_path):
+        """Downscaled and original analyses of the same bytes use different entries."""
+        from batch7_process_images import _ocr_cache_paths
+
+        image = tmp_path / "scan.png"
+        image.write_bytes(b"same bytes")
+
+        assert _ocr_cache_paths(tmp_path, image, True) != _ocr_cache_paths(tmp_path, image, False)
+        assert _ocr_cache_paths(tmp_path, image, True) == _ocr_cache_paths(tmp_path, image, True)
+
+    def test_batched_results_use_their_own_entry(self, tmp_path):
+        """Results from a multi-image request are not stored as single-image results."""
+        from batch7_process_images import _ocr_cache_paths
+
+        image = tmp_path / "scan.png"
+        image.write_bytes(b"same bytes")
+
+        single, batched = _ocr_cache_paths(tmp_path, image, True)
+        assert single != batched
+
+    @pytest.mark.parametrize("batched", [True, False])
+    def test_batch_results_cached_by_how_they_were_made(self, tmp_path, batched):
+        """One-by-one fallback results go to the single-image entry, real batch results to the batch entry."""
+        from batch7_process_images import _ocr_cache_paths, analyze_image_batch
+
+        images = [tmp_path / "a.png", tmp_path / "b.png"]
+        for n, image in enumerate(images):
+            image.write_bytes(b"image %d" % n)
+        cache_dir = tmp_path / "cache"
+
+        fresh = [{"file_name": "a.png"}, {"file_name": "b.png"}]
+        with patch("batch7_process_images._analyze_image_batch_uncached", return_value=(fresh, batched)):
+            analyze_image_batch(images, Mock(), cache_dir)
+
+        for image in images:
+            single, batch = _ocr_cache_paths(cache_dir, image)
+            assert batch.exists() == batched
+            assert single.exists() != batched
+
+    def test_pool_not_started_until_first_submit(self):
+        """The process pool is only created when an upload actually needs it."""
+        from batch7_process_images import _LazyProcessPool
+
+        pool = _LazyProcessPool(max_workers=1)
+        assert pool._pool is None
+        pool.shutdown()
+        assert pool._pool is None
+
+
 # ============================================================================
 # INTEGRATION TESTS
 # ============================================================================
 
 @pytest.mark.integration
+@pytest.mark.slow
 @pytest.mark.images
 class TestImagesIntegration:
     """Integration tests for complete workflow."""
 
-    @patch('batch7_process_images.genai.Client')
-    def test_end_to_end_processing(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_end_to_end_processing(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test complete end-to-end image processing."""
         # Setup
         images_dir = temp_dir / "IMAGES" / "001"
@@ -549,22 +547,17 @@ class TestImagesIntegration:
 
         # Create test image
         img_path = images_dir / "HOUSE_OVERSIGHT_010477.jpg"
-        img = Image.new('RGB', (800, 600), color='white')
+        img = Image.new('RGB', (1, 1), color='white')
         img.save(img_path)
 
         # Mock client
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-
         response = {
             "file_name": "HOUSE_OVERSIGHT_010477.jpg",
             "image_analysis": {"type": "document"},
             "text_extraction": {"full_text": "Test document"},
             "structured_data": {"dates": ["2024-01-15"]}
         }
-        mock_stream = [Mock(text=json.dumps(response))]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client(response)
         mock_genai.return_value = mock_client
 
         # Process
@@ -582,8 +575,8 @@ class TestImagesIntegration:
         assert data["house_oversight_id"] == "010477"
         assert "processing_metadata" in data
 
-    @patch('batch7_process_images.genai.Client')
-    def test_multiple_images_processing(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_multiple_images_processing(self, mock_genai, temp_dir, mock_env_with_api_key, make_mock_client):
         """Test processing multiple images."""
         images_dir = temp_dir / "IMAGES"
         images_dir.mkdir()
@@ -591,14 +584,10 @@ class TestImagesIntegration:
         # Create multiple images
         for i in range(3):
             img_path = images_dir / f"test_{i}.jpg"
-            img = Image.new('RGB', (100, 100))
+            img = Image.new('RGB', (1, 1))
             img.save(img_path)
 
-        mock_client = Mock()
-        mock_file = Mock(uri="file://test", mime_type="image/jpeg")
-        mock_client.files.upload.return_value = mock_file
-        mock_stream = [Mock(text='{"file_name": "test.jpg"}')]
-        mock_client.models.generate_content_stream.return_value = mock_stream
+        mock_client = make_mock_client('{"file_name": "test.jpg"}')
         mock_genai.return_value = mock_client
 
         process_images(images_dir, temp_dir / "output", skip_existing=False)
@@ -9,14 +9,9 @@ Tests Excel/natives processing functionality including:
 - Error handling and edge cases
 """
 import json
-import sys
-from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 import pytest
-import pandas as pd
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from batch7_process_natives import (
     read_excel_to_text,
@@ -64,14 +59,12 @@ class TestReadExcelToText:
 
         assert "ERROR" in text
 
-    def test_read_excel_multiple_sheets(self, temp_dir):
+    def test_read_excel_multiple_sheets(self, temp_dir, make_xlsx):
         """Test reading Excel file with multiple sheets."""
         excel_path = temp_dir / "multisheet.xlsx"
 
         # Create Excel with multiple sheets
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            pd.DataFrame({'A': [1, 2]}).to_excel(writer, sheet_name='Sheet1', index=False)
-            pd.DataFrame({'B': [3, 4]}).to_excel(writer, sheet_name='Sheet2', index=False)
+        make_xlsx(excel_path, {'Sheet1': [['A'], [1], [2]], 'Sheet2': [['B'], [3], [4]]})
 
         text = read_excel_to_text(excel_path)
 
@@ -79,10 +72,10 @@ class TestReadExcelToText:
         assert "Sheet2" in text
         assert text.count("WORKSHEET:") == 2
 
-    def test_read_empty_excel(self, temp_dir):
+    def test_read_empty_excel(self, temp_dir, make_xlsx):
         """Test reading an empty Excel file."""
         excel_path = temp_dir / "empty.xlsx"
-        pd.DataFrame().to_excel(excel_path, index=False, engine='openpyxl')
+        make_xlsx(excel_path, [])
 
         text = read_excel_to_text(excel_path)
 
@@ -111,10 +104,10 @@ class TestReadExcelToText:
 class TestAnalyzeExcelWithLLM:
     """Tests for LLM analysis of Excel data."""
 
-    def test_analyze_with_valid_json_response(self, sample_excel_file, mock_llm_response_natives):
+    def test_analyze_with_valid_json_response(self, sample_excel_file, mock_llm_response_natives_json):
         """Test LLM analysis with valid JSON response."""
         mock_client = Mock()
-        mock_stream = [Mock(text=json.dumps(mock_llm_response_natives))]
+        mock_stream = [SimpleNamespace(text=mock_llm_response_natives_json)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         excel_text = "Sample Excel data"
@@ -132,8 +125,8 @@ class TestAnalyzeExcelWithLLM:
 
         # Simulate chunked response
         json_str = json.dumps(response_data)
-        chunk1 = Mock(text=json_str[:len(json_str)//2])
-        chunk2 = Mock(text=json_str[len(json_str)//2:])
+        chunk1 = SimpleNamespace(text=json_str[:len(json_str)//2])
+        chunk2 = SimpleNamespace(text=json_str[len(json_str)//2:])
 
         mock_client.models.generate_content_stream.return_value = [chunk1, chunk2]
 
@@ -147,7 +140,7 @@ class TestAnalyzeExcelWithLLM:
         response_data = {"file_name": "test.xlsx", "structure": {}}
         markdown_response = f"```json\n{json.dumps(response_data)}\n```"
 
-        mock_stream = [Mock(text=markdown_response)]
+        mock_stream = [SimpleNamespace(text=markdown_response)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = analyze_excel_with_llm(sample_excel_file, "data", mock_client)
@@ -157,7 +150,7 @@ class TestAnalyzeExcelWithLLM:
     def test_analyze_with_invalid_json_response(self, sample_excel_file, capsys):
         """Test LLM analysis with invalid JSON response."""
         mock_client = Mock()
-        mock_stream = [Mock(text="This is not valid JSON")]
+        mock_stream = [SimpleNamespace(text="This is not valid JSON")]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = analyze_excel_with_llm(sample_excel_file, "data", mock_client)
@@ -170,7 +163,7 @@ class TestAnalyzeExcelWithLLM:
     def test_analyze_prompt_includes_data(self, sample_excel_file):
         """Test that analysis prompt includes the Excel data."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         excel_text = "UNIQUE_TEST_DATA_12345"
@@ -183,14 +176,14 @@ class TestAnalyzeExcelWithLLM:
         # The prompt should be in the contents
         contents = call_args.kwargs['contents']
         assert len(contents) > 0
-        # Check that our unique data is in the prompt
-        prompt_text = contents[0].parts[0].text
+        # Check that our unique data is in the prompt (instructions and data are separate parts)
+        prompt_text = "".join(part.text for part in contents[0].parts)
         assert "UNIQUE_TEST_DATA_12345" in prompt_text
 
     def test_analyze_uses_correct_model(self, sample_excel_file):
         """Test that correct model is specified."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         analyze_excel_with_llm(sample_excel_file, "data", mock_client)
@@ -204,9 +197,9 @@ class TestAnalyzeExcelWithLLM:
         response_data = {"file_name": "test.xlsx"}
 
         # Some chunks with no text
-        chunk1 = Mock(text=None)
-        chunk2 = Mock(text=json.dumps(response_data))
-        chunk3 = Mock(text=None)
+        chunk1 = SimpleNamespace(text=None)
+        chunk2 = SimpleNamespace(text=json.dumps(response_data))
+        chunk3 = SimpleNamespace(text=None)
 
         mock_client.models.generate_content_stream.return_value = [chunk1, chunk2, chunk3]
 
@@ -228,7 +221,7 @@ class TestProcessSingleExcel:
         """Test that processing creates output JSON file."""
         mock_client = Mock()
         response = {"file_name": sample_excel_file.name, "structure": {}}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         process_single_excel(sample_excel_file, temp_dir, mock_client, skip_existing=False)
@@ -242,15 +235,15 @@ class TestProcessSingleExcel:
             data = json.load(f)
         assert "file_name" in data
 
-    def test_process_single_excel_adds_metadata(self, sample_excel_file, temp_dir):
+    def test_process_single_excel_adds_metadata(self, sample_excel_file, temp_dir, make_xlsx):
         """Test that processing adds file_path and house_oversight_id."""
         # Create Excel file with HOUSE_OVERSIGHT ID in name
         excel_path = temp_dir / "HOUSE_OVERSIGHT_010477.xlsx"
-        pd.DataFrame({'A': [1, 2]}).to_excel(excel_path, index=False, engine='openpyxl')
+        make_xlsx(excel_path, [['A'], [1], [2]])
 
         mock_client = Mock()
         response = {"file_name": excel_path.name}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         process_single_excel(excel_path, temp_dir, mock_client, skip_existing=False)
@@ -282,10 +275,10 @@ class TestProcessSingleExcel:
             data = json.load(f)
         assert data == {"existing": True}
 
-    def test_process_single_excel_error_handling(self, temp_dir, capsys):
+    def test_process_single_excel_error_handling(self, temp_dir, caplog, make_xlsx):
         """Test error handling for processing failures."""
         excel_path = temp_dir / "test.xlsx"
-        pd.DataFrame({'A': [1]}).to_excel(excel_path, index=False, engine='openpyxl')
+        make_xlsx(excel_path, [['A'], [1]])
 
         mock_client = Mock()
         # Simulate error
@@ -294,14 +287,13 @@ class TestProcessSingleExcel:
         # Should not raise, but print error
         process_single_excel(excel_path, temp_dir, mock_client, skip_existing=False)
 
-        captured = capsys.readouterr()
-        assert "ERROR" in captured.err
+        assert any(record.levelname == "ERROR" for record in caplog.records)
 
     def test_process_single_excel_output_location(self, sample_excel_file, temp_dir):
         """Test that output is saved in same directory as Excel file."""
         mock_client = Mock()
         response = {"file_name": sample_excel_file.name}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         # Pass different output_dir
@@ -330,7 +322,7 @@ class TestProcessNatives:
         with pytest.raises(SystemExit):
             process_natives(temp_dir, temp_dir, skip_existing=False)
 
-    @patch('batch7_process_natives.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_natives_finds_excel_files(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that process_natives finds all Excel files."""
         # Create test Excel files
@@ -340,7 +332,7 @@ class TestProcessNatives:
         (temp_dir / "subdir" / "file3.xlsx").touch()
 
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -350,7 +342,7 @@ class TestProcessNatives:
             # Should find all 3 files
             assert mock_process.call_count == 3
 
-    @patch('batch7_process_natives.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_natives_no_files(self, mock_genai, temp_dir, mock_env_with_api_key, capsys):
         """Test behavior when no Excel files found."""
         mock_client = Mock()
@@ -361,14 +353,14 @@ class TestProcessNatives:
         captured = capsys.readouterr()
         assert "No Excel files found" in captured.out
 
-    @patch('batch7_process_natives.genai.Client')
-    def test_process_natives_skip_existing(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_process_natives_skip_existing(self, mock_genai, temp_dir, mock_env_with_api_key, make_xlsx):
         """Test skip_existing flag propagates to process_single_excel."""
         excel_path = temp_dir / "test.xlsx"
-        pd.DataFrame({'A': [1]}).to_excel(excel_path, index=False, engine='openpyxl')
+        make_xlsx(excel_path, [['A'], [1]])
 
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -379,14 +371,14 @@ class TestProcessNatives:
             call_args = mock_process.call_args
             assert call_args.args[3] == True  # skip_existing parameter
 
-    @patch('batch7_process_natives.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_natives_creates_client(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that Gemini client is created with API key."""
         excel_path = temp_dir / "test.xlsx"
         excel_path.touch()
 
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -394,7 +386,8 @@ class TestProcessNatives:
             process_natives(temp_dir, temp_dir, skip_existing=False)
 
         # Check client was created with API key
-        mock_genai.assert_called_once_with(api_key='test-api-key-12345')
+        mock_genai.assert_called_once()
+        assert mock_genai.call_args.kwargs['api_key'] == 'test-api-key-12345'
 
 
 # ============================================================================
@@ -428,12 +421,13 @@ class TestConstants:
 # ============================================================================
 
 @pytest.mark.integration
+@pytest.mark.slow
 @pytest.mark.natives
 class TestNativesIntegration:
     """Integration tests for complete workflow."""
 
-    @patch('batch7_process_natives.genai.Client')
-    def test_end_to_end_processing(self, mock_genai, temp_dir, sample_excel_data, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_end_to_end_processing(self, mock_genai, temp_dir, sample_excel_data, mock_env_with_api_key, make_xlsx):
         """Test complete end-to-end Excel processing."""
         # Setup
         natives_dir = temp_dir / "NATIVES"
@@ -443,7 +437,7 @@ class TestNativesIntegration:
 
         # Create test Excel file
         excel_path = natives_dir / "HOUSE_OVERSIGHT_010477.xlsx"
-        sample_excel_data.to_excel(excel_path, index=False, engine='openpyxl')
+        make_xlsx(excel_path, [list(sample_excel_data.columns), *sample_excel_data.itertuples(index=False)])
 
         # Mock LLM response
         mock_client = Mock()
@@ -453,7 +447,7 @@ class TestNativesIntegration:
             "entities": {"people": ["John Doe"]},
             "relationships": []
         }
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -472,8 +466,8 @@ class TestNativesIntegration:
         assert data["house_oversight_id"] == "010477"
         assert "file_path" in data
 
-    @patch('batch7_process_natives.genai.Client')
-    def test_multiple_files_processing(self, mock_genai, temp_dir, mock_env_with_api_key):
+    @patch('_common.genai.Client')
+    def test_multiple_files_processing(self, mock_genai, temp_dir, mock_env_with_api_key, make_xlsx):
         """Test processing multiple Excel files."""
         natives_dir = temp_dir / "NATIVES"
         natives_dir.mkdir()
@@ -481,10 +475,10 @@ class TestNativesIntegration:
         # Create multiple Excel files
         for i in range(3):
             excel_path = natives_dir / f"test_{i}.xlsx"
-            pd.DataFrame({'A': [i]}).to_excel(excel_path, index=False, engine='openpyxl')
+            make_xlsx(excel_path, [['A'], [i]])
 
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.xlsx"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.xlsx"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -9,16 +9,14 @@ Tests text processing functionality including:
 - Error handling and edge cases
 """
 import json
-import sys
-from pathlib import Path
+import tarfile
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock, mock_open
 import pytest
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from batch7_process_text import (
     extract_text_content,
+    extract_text_batch,
     assemble_stories,
     create_story_folders,
     process_text,
@@ -36,10 +34,10 @@ from batch7_process_text import (
 class TestExtractTextContent:
     """Tests for text content extraction."""
 
-    def test_extract_with_valid_response(self, sample_text_file, mock_llm_response_text):
+    def test_extract_with_valid_response(self, sample_text_file, mock_llm_response_text_json):
         """Test extraction with valid JSON response."""
         mock_client = Mock()
-        mock_stream = [Mock(text=json.dumps(mock_llm_response_text))]
+        mock_stream = [SimpleNamespace(text=mock_llm_response_text_json)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -53,7 +51,7 @@ class TestExtractTextContent:
         """Test that per-file JSON is created when enabled."""
         mock_client = Mock()
         response = {"file_name": sample_text_file.name, "content": {}}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         extract_text_content(sample_text_file, mock_client, save_per_file=True)
@@ -66,7 +64,7 @@ class TestExtractTextContent:
         """Test that per-file JSON is not created when disabled."""
         mock_client = Mock()
         response = {"file_name": sample_text_file.name, "content": {}}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -74,6 +72,20 @@ class TestExtractTextContent:
         output_file = sample_text_file.parent / f"{sample_text_file.stem}_extraction.json"
         assert not output_file.exists()
 
+    def test_extract_keeps_raw_reply_under_raw_dir(self, sample_text_file, temp_dir):
+        """Test that an unparseable reply is kept in raw_dir, not next to the input."""
+        raw_dir = temp_dir / "raw"  # created by the first raw file written
+        mock_client = Mock()
+        mock_client.models.generate_content_stream.return_value = [SimpleNamespace(text="not json")]
+
+        extract_text_content(sample_text_file, mock_client, save_per_file=False, raw_dir=raw_dir)
+
+        kept = list(raw_dir.iterdir())
+        assert len(kept) == 1
+        assert kept[0].name.endswith("_extraction_error.raw.txt")
+        assert kept[0].read_text(encoding="utf-8") == "not json"
+        assert not list(sample_text_file.parent.glob("*.raw*"))
+
     def test_extract_reads_file_content(self, temp_dir):
         """Test that file content is read correctly."""
         text_path = temp_dir / "test.txt"
@@ -81,7 +93,7 @@ class TestExtractTextContent:
 
         mock_client = Mock()
         response = {"file_name": "test.txt"}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         extract_text_content(text_path, mock_client, save_per_file=False)
@@ -89,7 +101,7 @@ class TestExtractTextContent:
         # Check that generate_content_stream was called
         call_args = mock_client.models.generate_content_stream.call_args
         contents = call_args.kwargs['contents']
-        prompt_text = contents[0].parts[0].text
+        prompt_text = "".join(part.text for part in contents[0].parts)
 
         assert "UNIQUE_CONTENT_12345" in prompt_text
 
@@ -111,7 +123,7 @@ class TestExtractTextContent:
 
         mock_client = Mock()
         response = {"file_name": "test.txt"}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(text_path, mock_client, save_per_file=False)
@@ -124,7 +136,7 @@ class TestExtractTextContent:
         mock_client = Mock()
         response = {"file_name": "test.txt", "content": {}}
         markdown_response = f"```json\n{json.dumps(response)}\n```"
-        mock_stream = [Mock(text=markdown_response)]
+        mock_stream = [SimpleNamespace(text=markdown_response)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -136,7 +148,7 @@ class TestExtractTextContent:
         mock_client = Mock()
         response = {"file_name": "test.txt"}
         code_block = f"```\n{json.dumps(response)}\n```"
-        mock_stream = [Mock(text=code_block)]
+        mock_stream = [SimpleNamespace(text=code_block)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -148,7 +160,7 @@ class TestExtractTextContent:
         mock_client = Mock()
         response = {"file_name": "test.txt"}
         prefixed_response = f"Here is the response:\n{json.dumps(response)}"
-        mock_stream = [Mock(text=prefixed_response)]
+        mock_stream = [SimpleNamespace(text=prefixed_response)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -158,7 +170,7 @@ class TestExtractTextContent:
     def test_extract_invalid_json_creates_error_file(self, sample_text_file):
         """Test that invalid JSON creates error file."""
         mock_client = Mock()
-        mock_stream = [Mock(text="This is not valid JSON")]
+        mock_stream = [SimpleNamespace(text="This is not valid JSON")]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -176,7 +188,7 @@ class TestExtractTextContent:
         """Test that processing metadata is added."""
         mock_client = Mock()
         response = {"file_name": "test.txt"}
-        mock_stream = [Mock(text=json.dumps(response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -189,7 +201,7 @@ class TestExtractTextContent:
     def test_extract_uses_correct_model(self, sample_text_file):
         """Test that correct model is used."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"file_name": "test.txt"}')]
+        mock_stream = [SimpleNamespace(text='{"file_name": "test.txt"}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         extract_text_content(sample_text_file, mock_client, save_per_file=False)
@@ -203,8 +215,8 @@ class TestExtractTextContent:
         response = {"file_name": "test.txt"}
         json_str = json.dumps(response)
 
-        chunk1 = Mock(text=json_str[:len(json_str)//2])
-        chunk2 = Mock(text=json_str[len(json_str)//2:])
+        chunk1 = SimpleNamespace(text=json_str[:len(json_str)//2])
+        chunk2 = SimpleNamespace(text=json_str[len(json_str)//2:])
 
         mock_client.models.generate_content_stream.return_value = [chunk1, chunk2]
 
@@ -212,6 +224,140 @@ class TestExtractTextContent:
 
         assert result["file_name"] == "test.txt"
 
+    @patch('batch7_process_text.time.sleep')
+    def test_extract_retries_rate_limited_request(self, mock_sleep, sample_text_file):
+        """Test that a 429 before any output is retried after a backoff."""
+        from google.genai import errors
+
+        mock_client = Mock()
+        rate_limited = errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+        mock_client.models.generate_content_stream.side_effect = [
+            rate_limited,
+            [SimpleNamespace(text=json.dumps({"file_name": "test.txt"}))],
+        ]
+
+        result = extract_text_content(sample_text_file, mock_client, save_per_file=False)
+
+        assert "error" not in result
+        assert mock_client.models.generate_content_stream.call_count == 2
+        assert mock_sleep.call_count == 1
+
+
+# ============================================================================
+# TESTS: extract_text_batch()
+# ============================================================================
+
+def _batch_output_line(key, text):
+    """One line of Batch API output holding a successful response."""
+    return json.dumps({"key": key, "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}})
+
+
+def _mock_batch_client(state, output_lines=()):
+    """Client whose batch job is created already in `state` and returns output_lines."""
+    mock_client = Mock()
+    mock_client.files.upload.return_value = SimpleNamespace(name="files/input")
+    mock_client.batches.create.return_value = SimpleNamespace(
+        name="batches/1",
+        state=SimpleNamespace(name=state),
+        dest=SimpleNamespace(file_name="files/output"),
+    )
+    mock_client.files.download.return_value = "\n".join(output_lines).encode()
+    return mock_client
+
+
+@pytest.mark.unit
+@pytest.mark.text
+class TestExtractTextBatch:
+    """Tests for extract_text_batch function."""
+
+    def test_batch_maps_results_back_in_order(self, temp_dir):
+        """Test that one job covers all files and results follow input order."""
+        text_dir = temp_dir / "TEXT"
+        text_dir.mkdir()
+        paths = [text_dir / "HOUSE_OVERSIGHT_010477.txt", text_dir / "second.txt"]
+        paths[0].write_text("First letter")
+        paths[1].write_text("Second letter")
+
+        mock_client = _mock_batch_client("JOB_STATE_SUCCEEDED", [
+            _batch_output_line("1", '{"content": {"full_text": "Second letter"}}'),
+            _batch_output_line("0", '{"content": {"full_text": "First letter"}}'),
+        ])
+
+        results = extract_text_batch(paths, mock_client, save_per_file=False)
+
+        assert mock_client.batches.create.call_count == 1
+        assert not mock_client.models.generate_content_stream.called
+        assert [r["file_name"] for r in results] == ["HOUSE_OVERSIGHT_010477.txt", "second.txt"]
+        assert results[0]["house_oversight_id"] == "010477"
+        assert results[1]["content"]["full_text"] == "Second letter"
+
+        uploaded = mock_client.files.upload.call_args.kwargs["file"].getvalue().splitlines()
+        assert len(uploaded) == 2
+        assert "First letter" in json.loads(uploaded[0])["request"]["contents"][0]["parts"][1]["text"]
+
+    def test_batch_reports_per_request_errors(self, temp_dir):
+        """Test that a failed request becomes a fallback result with an error."""
+        text_path = temp_dir / "test.txt"
+        text_path.write_text("Content")
+
+        mock_client = _mock_batch_client("JOB_STATE_SUCCEEDED", [
+            json.dumps({"key": "0", "error": {"code": 500, "message": "Internal"}}),
+        ])
+
+        results = extract_text_batch([text_path], mock_client, save_per_file=False)
+
+        assert "error" in results[0]
+        assert results[0]["content"]["full_text"] == "Content"
+
+    def test_batch_job_failure_raises(self, temp_dir):
+        """Test that an unsuccessful job raises so callers can fall back to streaming."""
+        text_path = temp_dir / "test.txt"
+        text_path.write_text("Content")
+
+        mock_client = _mock_batch_client("JOB_STATE_FAILED")
+
+        with pytest.raises(RuntimeError):
+            extract_text_batch([text_path], mock_client, save_per_file=False)
+
+    @patch('batch7_process_text.time.sleep')
+    def test_batch_poll_retries_transient_errors(self, mock_sleep, temp_dir):
+        """Test that a transient error while polling does not abandon the job."""
+        from google.genai import errors
+
+        text_path = temp_dir / "test.txt"
+        text_path.write_text("Content")
+
+        mock_client = _mock_batch_client("JOB_STATE_RUNNING", [
+            _batch_output_line("0", '{"content": {"full_text": "Content"}}'),
+        ])
+        done = SimpleNamespace(
+            name="batches/1",
+            state=SimpleNamespace(name="JOB_STATE_SUCCEEDED"),
+            dest=SimpleNamespace(file_name="files/output"),
+        )
+        mock_client.batches.get.side_effect = [
+            errors.ServerError(503, {"error": {"code": 503, "message": "overloaded"}}),
+            done,
+        ]
+
+        results = extract_text_batch([text_path], mock_client, save_per_file=False)
+
+        assert mock_client.batches.get.call_count == 2
+        assert "error" not in results[0]
+
+    @patch('batch7_process_text.time.sleep')
+    def test_batch_poll_gives_up_after_max_wait(self, mock_sleep):
+        """Test that a job still running at the deadline is cancelled and reported as failed."""
+        from batch7_process_text import _wait_for_batch
+
+        mock_client = Mock()
+        job = SimpleNamespace(name="batches/1", state=SimpleNamespace(name="JOB_STATE_PENDING"))
+        mock_client.batches.get.return_value = job
+
+        with pytest.raises(RuntimeError):
+            _wait_for_batch(mock_client, job, max_wait=0)
+        mock_client.batches.cancel.assert_called_once_with(name="batches/1")
+
 
 # ============================================================================
 # TESTS: assemble_stories()
@@ -222,10 +368,10 @@ class TestExtractTextContent:
 class TestAssembleStories:
     """Tests for story assembly."""
 
-    def test_assemble_with_valid_response(self, mock_llm_response_grouping):
+    def test_assemble_with_valid_response(self, mock_llm_response_grouping_json):
         """Test story assembly with valid response."""
         mock_client = Mock()
-        mock_stream = [Mock(text=json.dumps(mock_llm_response_grouping))]
+        mock_stream = [SimpleNamespace(text=mock_llm_response_grouping_json)]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         text_extractions = [
@@ -241,7 +387,7 @@ class TestAssembleStories:
     def test_assemble_includes_all_extractions(self):
         """Test that all text extractions are included in prompt."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"stories": []}')]
+        mock_stream = [SimpleNamespace(text='{"stories": []}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         text_extractions = [
@@ -252,14 +398,14 @@ class TestAssembleStories:
 
         call_args = mock_client.models.generate_content_stream.call_args
         contents = call_args.kwargs['contents']
-        prompt_text = contents[0].parts[0].text
+        prompt_text = "".join(part.text for part in contents[0].parts)
 
         assert "UNIQUE_FILE_12345.txt" in prompt_text
 
     def test_assemble_with_invalid_json(self):
         """Test handling of invalid JSON response."""
         mock_client = Mock()
-        mock_stream = [Mock(text="Not valid JSON")]
+        mock_stream = [SimpleNamespace(text="Not valid JSON")]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         text_extractions = [{"file_name": "file1.txt", "content": {"full_text": "Text"}, "metadata": {}, "entities": {}}]
@@ -273,7 +419,7 @@ class TestAssembleStories:
     def test_assemble_empty_extractions(self):
         """Test assembling with no text extractions."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"stories": []}')]
+        mock_stream = [SimpleNamespace(text='{"stories": []}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         result = assemble_stories([], mock_client)
@@ -283,7 +429,7 @@ class TestAssembleStories:
     def test_assemble_uses_correct_model(self):
         """Test that correct model is used."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"stories": []}')]
+        mock_stream = [SimpleNamespace(text='{"stories": []}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         text_extractions = [{"file_name": "file1.txt", "content": {"full_text": "Text"}, "metadata": {}, "entities": {}}]
@@ -296,7 +442,7 @@ class TestAssembleStories:
     def test_assemble_truncates_long_content(self):
         """Test that long content is truncated in prompt."""
         mock_client = Mock()
-        mock_stream = [Mock(text='{"stories": []}')]
+        mock_stream = [SimpleNamespace(text='{"stories": []}')]
         mock_client.models.generate_content_stream.return_value = mock_stream
 
         long_text = "A" * 5000  # Very long text
@@ -308,11 +454,31 @@ class TestAssembleStories:
 
         call_args = mock_client.models.generate_content_stream.call_args
         contents = call_args.kwargs['contents']
-        prompt_text = contents[0].parts[0].text
+        prompt_text = "".join(part.text for part in contents[0].parts)
 
         # Should be truncated to 2000 chars
         assert prompt_text.count("A") <= 2000
 
+    def test_assemble_lists_identical_text_once(self):
+        """Test that files with identical text are sent once and expanded in the stories."""
+        mock_client = Mock()
+        response = {"stories": [{"id": "S0001", "text_files": ["file1.txt"]}], "unassigned_files": []}
+        mock_stream = [SimpleNamespace(text=json.dumps(response))]
+        mock_client.models.generate_content_stream.return_value = mock_stream
+
+        text_extractions = [
+            {"file_name": "file1.txt", "content": {"full_text": "Same letter"}, "metadata": {}, "entities": {}},
+            {"file_name": "file2.txt", "content": {"full_text": "Same letter"}, "metadata": {}, "entities": {}},
+        ]
+
+        result = assemble_stories(text_extractions, mock_client)
+
+        contents = mock_client.models.generate_content_stream.call_args.kwargs['contents']
+        prompt_text = "".join(part.text for part in contents[0].parts)
+        assert prompt_text.count("Same letter") == 1
+        assert "Identical copies: file2.txt" in prompt_text
+        assert result["stories"][0]["text_files"] == ["file1.txt", "file2.txt"]
+
 
 # ============================================================================
 # TESTS: create_story_folders()
@@ -438,6 +604,27 @@ class TestCreateStoryFolders:
         # Should have no subdirectories
         assert list(letters_dir.iterdir()) == []
 
+    def test_create_folders_pack_writes_tar(self, temp_dir):
+        """Test that pack mode writes letters.tar instead of story folders."""
+        stories = {
+            "stories": [
+                {"id": "S0001", "title": "Story 1", "text_files": ["a.txt", "b.txt"], "assembled_text": "Text 1"},
+                {"id": "S0002", "title": "Story 2", "text_files": [], "assembled_text": "Text 2"}
+            ]
+        }
+
+        written = create_story_folders(stories, temp_dir, {}, pack=True)
+
+        assert written == temp_dir / "letters.tar"
+        assert not (temp_dir / "letters").exists()
+        with tarfile.open(written) as tf:
+            assert sorted(tf.getnames()) == [
+                "S0001/meta.json", "S0001/source_files.txt", "S0001/text.txt",
+                "S0002/meta.json", "S0002/source_files.txt", "S0002/text.txt",
+            ]
+            assert json.loads(tf.extractfile("S0001/meta.json").read())["title"] == "Story 1"
+            assert tf.extractfile("S0001/source_files.txt").read() == b"a.txt\nb.txt"
+
     def test_create_folders_missing_fields(self, temp_dir):
         """Test handling of stories with missing fields."""
         stories = {
@@ -467,7 +654,7 @@ class TestProcessText:
         with pytest.raises(SystemExit):
             process_text(temp_dir, temp_dir, skip_existing=False)
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_no_files(self, mock_genai, temp_dir, mock_env_with_api_key, capsys):
         """Test behavior when no text files found."""
         mock_client = Mock()
@@ -478,7 +665,7 @@ class TestProcessText:
         captured = capsys.readouterr()
         assert "No text files found" in captured.out
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_creates_output_files(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that processing creates expected output files."""
         # Create text files
@@ -492,8 +679,8 @@ class TestProcessText:
         extraction_response = {"file_name": "file1.txt", "content": {"full_text": "Content 1"}, "metadata": {}, "entities": {}}
         stories_response = {"stories": []}
 
-        mock_stream1 = [Mock(text=json.dumps(extraction_response))]
-        mock_stream2 = [Mock(text=json.dumps(stories_response))]
+        mock_stream1 = [SimpleNamespace(text=json.dumps(extraction_response))]
+        mock_stream2 = [SimpleNamespace(text=json.dumps(stories_response))]
 
         mock_client.models.generate_content_stream.side_effect = [mock_stream1, mock_stream2]
         mock_genai.return_value = mock_client
@@ -505,7 +692,7 @@ class TestProcessText:
         assert (output_dir / "stories_assembly.json").exists()
         assert (output_dir / "letters").exists()
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_skip_existing_extractions(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that skip_existing skips extraction phase."""
         text_dir = temp_dir / "text"
@@ -521,7 +708,7 @@ class TestProcessText:
 
         mock_client = Mock()
         stories_response = {"stories": []}
-        mock_stream = [Mock(text=json.dumps(stories_response))]
+        mock_stream = [SimpleNamespace(text=json.dumps(stories_response))]
         mock_client.models.generate_content_stream.return_value = mock_stream
         mock_genai.return_value = mock_client
 
@@ -530,7 +717,101 @@ class TestProcessText:
         # Should only call once for stories, not for extraction
         assert mock_client.models.generate_content_stream.call_count == 1
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
+    def test_process_reuses_cached_extraction_for_unchanged_file(self, mock_genai, temp_dir, mock_env_with_api_key):
+        """Test that a re-run recalls unchanged files from the extraction cache."""
+        text_dir = temp_dir / "text"
+        text_dir.mkdir()
+        (text_dir / "file1.txt").write_text("Content 1")
+
+        output_dir = temp_dir / "output"
+
+        mock_client = Mock()
+        extraction_response = {"file_name": "file1.txt", "content": {"full_text": "Content 1"}, "metadata": {}, "entities": {}}
+        stories_response = {"stories": []}
+        mock_client.models.generate_content_stream.side_effect = [
+            [SimpleNamespace(text=json.dumps(extraction_response))],
+            [SimpleNamespace(text=json.dumps(stories_response))],
+            [SimpleNamespace(text=json.dumps(stories_response))],
+        ]
+        mock_genai.return_value = mock_client
+
+        process_text(text_dir, output_dir, skip_existing=False)
+        process_text(text_dir, output_dir, skip_existing=False)
+
+        # One extraction plus one assembly per run; the second run's extraction is a cache hit
+        assert mock_client.models.generate_content_stream.call_count == 3
+        with open(output_dir / "text_extractions.json") as f:
+            extractions = json.load(f)
+        assert extractions[0]["processing_metadata"]["cache_hit"] is True
+
+    @patch('_common.genai.Client')
+    def test_process_extracts_identical_files_once(self, mock_genai, temp_dir, mock_env_with_api_key):
+        """Test that byte-identical files in one run share a single extraction call."""
+        text_dir = temp_dir / "text"
+        (text_dir / "a").mkdir(parents=True)
+        (text_dir / "b").mkdir()
+        (text_dir / "a" / "file1.txt").write_text("Same letter")
+        (text_dir / "b" / "file2.txt").write_text("Same letter")
+
+        output_dir = temp_dir / "output"
+
+        mock_client = Mock()
+        extraction_response = {"file_name": "file1.txt", "content": {"full_text": "Same letter"}, "metadata": {}, "entities": {}}
+        mock_client.models.generate_content_stream.side_effect = [
+            [SimpleNamespace(text=json.dumps(extraction_response))],
+            [SimpleNamespace(text=json.dumps({"stories": []}))],
+        ]
+        mock_genai.return_value = mock_client
+
+        process_text(text_dir, output_dir, skip_existing=False, use_cache=False)
+
+        # One extraction plus one assembly
+        assert mock_client.models.generate_content_stream.call_count == 2
+        with open(output_dir / "text_extractions.json") as f:
+            extractions = json.load(f)
+        assert [ext["file_name"] for ext in extractions] == ["file1.txt", "file2.txt"]
+        assert (text_dir / "b" / "file2_extraction.json").exists()
+
+    @patch('_common.genai.Client')
+    def test_process_fuses_small_runs_into_one_call(self, mock_genai, temp_dir, mock_env_with_api_key):
+        """Test that a small run is extracted and assembled by a single request."""
+        text_dir = temp_dir / "text"
+        text_dir.mkdir()
+        (text_dir / "HOUSE_OVERSIGHT_010477.txt").write_text("Letter one")
+        (text_dir / "HOUSE_OVERSIGHT_010478.txt").write_text("Letter two")
+
+        output_dir = temp_dir / "output"
+
+        fused_response = {
+            "extractions": [
+                {"content": {"full_text": "Letter one"}, "metadata": {}, "entities": {}},
+                {"content": {"full_text": "Letter two"}, "metadata": {}, "entities": {}},
+            ],
+            "stories": {
+                "stories": [{
+                    "id": "S0001",
+                    "title": "Combined Story",
+                    "text_files": ["HOUSE_OVERSIGHT_010477.txt", "HOUSE_OVERSIGHT_010478.txt"],
+                    "assembled_text": "Combined narrative",
+                }]
+            },
+        }
+        mock_client = Mock()
+        mock_client.models.generate_content_stream.return_value = [SimpleNamespace(text=json.dumps(fused_response))]
+        mock_genai.return_value = mock_client
+
+        process_text(text_dir, output_dir, skip_existing=False, fuse_small_runs=True)
+
+        assert mock_client.models.generate_content_stream.call_count == 1
+        with open(output_dir / "text_extractions.json") as f:
+            extractions = json.load(f)
+        assert [e["file_name"] for e in extractions] == ["HOUSE_OVERSIGHT_010477.txt", "HOUSE_OVERSIGHT_010478.txt"]
+        assert extractions[1]["house_oversight_id"] == "010478"
+        assert (output_dir / "letters" / "S0001" / "meta.json").exists()
+        assert (text_dir / "HOUSE_OVERSIGHT_010477_extraction.json").exists()
+
+    @patch('_common.genai.Client')
     def test_process_skip_existing_stories(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that skip_existing skips story assembly."""
         text_dir = temp_dir / "text"
@@ -554,7 +835,7 @@ class TestProcessText:
         # Should not call LLM at all
         assert not mock_client.models.generate_content_stream.called
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_finds_text_files_recursively(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that text files are found recursively."""
         text_dir = temp_dir / "text"
@@ -572,9 +853,9 @@ class TestProcessText:
         stories_response = {"stories": []}
 
         # Need 3 responses: 2 extractions + 1 stories
-        mock_stream1 = [Mock(text=json.dumps(extraction_response))]
-        mock_stream2 = [Mock(text=json.dumps(extraction_response))]
-        mock_stream3 = [Mock(text=json.dumps(stories_response))]
+        mock_stream1 = [SimpleNamespace(text=json.dumps(extraction_response))]
+        mock_stream2 = [SimpleNamespace(text=json.dumps(extraction_response))]
+        mock_stream3 = [SimpleNamespace(text=json.dumps(stories_response))]
 
         mock_client.models.generate_content_stream.side_effect = [mock_stream1, mock_stream2, mock_stream3]
         mock_genai.return_value = mock_client
@@ -586,7 +867,7 @@ class TestProcessText:
             extractions = json.load(f)
         assert len(extractions) == 2
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_process_creates_client(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test that Gemini client is created with API key."""
         text_dir = temp_dir / "text"
@@ -597,15 +878,16 @@ class TestProcessText:
         extraction_response = {"file_name": "test.txt", "content": {"full_text": "Content"}, "metadata": {}, "entities": {}}
         stories_response = {"stories": []}
 
-        mock_stream1 = [Mock(text=json.dumps(extraction_response))]
-        mock_stream2 = [Mock(text=json.dumps(stories_response))]
+        mock_stream1 = [SimpleNamespace(text=json.dumps(extraction_response))]
+        mock_stream2 = [SimpleNamespace(text=json.dumps(stories_response))]
 
         mock_client.models.generate_content_stream.side_effect = [mock_stream1, mock_stream2]
         mock_genai.return_value = mock_client
 
         process_text(text_dir, temp_dir / "output", skip_existing=False)
 
-        mock_genai.assert_called_once_with(api_key='test-api-key-12345')
+        mock_genai.assert_called_once()
+        assert mock_genai.call_args.kwargs['api_key'] == 'test-api-key-12345'
 
 
 # ============================================================================
@@ -651,11 +933,12 @@ class TestConstants:
 # ============================================================================
 
 @pytest.mark.integration
+@pytest.mark.slow
 @pytest.mark.text
 class TestTextIntegration:
     """Integration tests for complete workflow."""
 
-    @patch('batch7_process_text.genai.Client')
+    @patch('_common.genai.Client')
     def test_end_to_end_processing(self, mock_genai, temp_dir, mock_env_with_api_key):
         """Test complete end-to-end text processing."""
         # Setup
@@ -693,9 +976,9 @@ class TestTextIntegration:
             ]
         }
 
-        mock_stream1 = [Mock(text=json.dumps(extraction1))]
-        mock_stream2 = [Mock(text=json.dumps(extraction2))]
-        mock_stream3 = [Mock(text=json.dumps(stories))]
+        mock_stream1 = [SimpleNamespace(text=json.dumps(extraction1))]
+        mock_stream2 = [SimpleNamespace(text=json.dumps(extraction2))]
+        mock_stream3 = [SimpleNamespace(text=json.dumps(stories))]
 
         mock_client.models.generate_content_stream.side_effect = [mock_stream1, mock_stream2, mock_stream3]
         mock_genai.return_value = mock_client
@@ -8,14 +8,9 @@ Tests pipeline orchestration including:
 - API key validation
 - Integration of all processing modules
 """
-import sys
-from pathlib import Path
 from unittest.mock import Mock, patch, call
 import pytest
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from run_batch7_pipeline import main
 
 
@@ -283,15 +278,19 @@ class TestProcessFlow:
     def test_processes_in_order(self, mock_text, mock_images, mock_natives, mock_env_with_api_key, mock_batch7_structure):
         """Test that processes execute in correct order."""
         call_order = []
+        clients = []
 
-        def record_natives(*args):
+        def record_natives(*args, **kwargs):
             call_order.append('natives')
+            clients.append(kwargs.get('client'))
 
-        def record_images(*args):
+        def record_images(*args, **kwargs):
             call_order.append('images')
+            clients.append(kwargs.get('client'))
 
-        def record_text(*args):
+        def record_text(*args, **kwargs):
             call_order.append('text')
+            clients.append(kwargs.get('client'))
 
         mock_natives.side_effect = record_natives
         mock_images.side_effect = record_images
@@ -304,6 +303,9 @@ class TestProcessFlow:
 
         # Should be called in order: natives, images, text
         assert call_order == ['natives', 'images', 'text']
+        # Every stage gets the same shared client
+        assert clients[0] is not None
+        assert all(client is clients[0] for client in clients)
 
     @patch('run_batch7_pipeline.process_natives')
     @patch('run_batch7_pipeline.process_images')
@@ -364,6 +366,7 @@ class TestOutputMessages:
 # ============================================================================
 
 @pytest.mark.integration
+@pytest.mark.slow
 class TestPipelineIntegration:
     """Integration tests for complete pipeline."""
 
@@ -0,0 +1,234 @@
+"""
+Unit tests for translate_letters.py
+
+Tests letter translation functionality including:
+- Paragraph window splitting for long letters
+- Batched translation and its per-letter fallback
+- Retries of transient Gemini errors
+- Translating byte-identical letters once
+- The prompt/model/text-keyed translation cache
+"""
+from argparse import Namespace
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+import pytest
+from google.genai import errors
+
+import translate_letters
+from translate_letters import (
+    _split_windows,
+    _translate_batch,
+    batch_translate,
+    main,
+)
+
+
+def make_stream_client(*replies):
+    """Return a mock client whose successive streaming calls yield the given replies."""
+    client = Mock()
+    client.models.generate_content_stream.side_effect = [
+        reply if isinstance(reply, Exception) else [SimpleNamespace(text=reply)]
+        for reply in replies
+    ]
+    return client
+
+
+def make_letters(root, texts):
+    """Create <root>/L0001, L0002, ... each holding a de.txt with the given text."""
+    for n, text in enumerate(texts, 1):
+        letter_dir = root / f"L{n:04d}"
+        letter_dir.mkdir(parents=True)
+        (letter_dir / "de.txt").write_text(text, encoding="utf-8")
+
+
+# ============================================================================
+# TESTS: _split_windows()
+# ============================================================================
+
+@pytest.mark.unit
+@pytest.mark.letters
+class TestSplitWindows:
+    """Tests for splitting long letters into paragraph windows."""
+
+    def test_packs_paragraphs_up_to_limit(self):
+        """Test that whole paragraphs share a window while they fit."""
+        text = "aaaa\n\nbbbb\n\ncccc"
+
+        assert _split_windows(text, 10) == [("aaaa\n\nbbbb", ""), ("cccc", "\n\n")]
+
+    def test_cuts_long_paragraph_at_sentence_end(self):
+        """Test that an oversized paragraph is cut after the last sentence that fits."""
+        text = "Erster Satz. Zweiter Satz? Dritter Satz!"
+
+        windows = _split_windows(text, 28)
+
+        assert windows == [("Erster Satz. Zweiter Satz?", ""), ("Dritter Satz!", " ")]
+
+    def test_cuts_long_paragraph_at_line_break(self):
+        """Test that a line break is used when no sentence ends before the limit."""
+        windows = _split_windows("Sehr geehrte Frau\nMueller und Herr Meier", 20)
+
+        assert windows[0] == ("Sehr geehrte Frau", "")
+        assert windows[1][1] == " "
+
+    def test_cuts_between_words_before_hard_cut(self):
+        """Test that a paragraph without sentence ends is cut between words, then mid-word."""
+        assert _split_windows("eins zwei drei vier", 10) == [("eins zwei", ""), ("drei vier", " ")]
+        assert _split_windows("x" * 25, 10) == [("x" * 10, ""), ("x" * 10, ""), ("x" * 5, "")]
+
+    def test_translation_rejoins_cut_paragraph_with_space(self, monkeypatch):
+        """Test that pieces of one paragraph are rejoined inline, paragraphs with a blank line."""
+        monkeypatch.setattr(translate_letters, "MAX_INPUT_CHARS", 28)
+        client = make_stream_client("First sentence. Second one?", "Third!", "New paragraph.")
+
+        english = translate_letters.translate_letter(
+            "Erster Satz. Zweiter Satz? Dritter Satz!\n\nEin neuer Absatz hier.", client
+        )
+
+        assert english == "First sentence. Second one? Third!\n\nNew paragraph."
+
+    def test_exact_multiple_leaves_no_empty_window(self):
+        """Test that a paragraph of exactly N * max_chars produces N full windows."""
+        windows = _split_windows("short\n\n" + "y" * 20, 10)
+
+        assert [window for window, _ in windows] == ["short", "y" * 10, "y" * 10]
+
+    def test_blank_paragraphs_leave_no_empty_window(self):
+        """Test that leading, trailing and repeated blank lines are not sent alone."""
+        windows = _split_windows("\n\n" + "z" * 10 + "\n\n\n\n", 10)
+
+        assert windows == [("z" * 10, "")]
+
+
+# ============================================================================
+# TESTS: batch_translate() / _translate_batch()
+# ============================================================================
+
+@pytest.mark.unit
+@pytest.mark.letters
+class TestBatchTranslate:
+    """Tests for packing several letters into one request."""
+
+    def test_splits_reply_at_boundaries(self):
+        """Test that each boundary section is returned under its letter's key."""
+        client = make_stream_client(
+            "<<<DOC_BOUNDARY id=1>>>\nFirst letter\n\n<<<DOC_BOUNDARY id=2>>>\nSecond letter\n"
+        )
+
+        result = batch_translate([("a", "Erster"), ("b", "Zweiter")], client)
+
+        assert result == {"a": "First letter", "b": "Second letter"}
+        prompt = client.models.generate_content_stream.call_args.kwargs["contents"][0].parts[1].text
+        assert "<<<DOC_BOUNDARY id=1>>>\nErster" in prompt
+        assert "<<<DOC_BOUNDARY id=2>>>\nZweiter" in prompt
+
+    def test_missing_or_empty_section_is_left_out(self):
+        """Test that letters without a usable section are not returned."""
+        client = make_stream_client("<<<DOC_BOUNDARY id=1>>>\nOnly one\n<<<DOC_BOUNDARY id=3>>>\n\n")
+
+        result = batch_translate([("a", "A"), ("b", "B"), ("c", "C")], client)
+
+        assert result == {"a": "Only one"}
+
+    def test_missing_letter_is_translated_singly(self, temp_dir):
+        """Test that a letter the batch reply skipped gets its own request."""
+        make_letters(temp_dir, ["Eins", "Zwei"])
+        batch = [(str(temp_dir / "L0001"), "Eins", None), (str(temp_dir / "L0002"), "Zwei", None)]
+        client = make_stream_client("<<<DOC_BOUNDARY id=1>>>\nOne", "Two")
+
+        translations = _translate_batch(batch, Namespace(latex=False), client)
+
+        assert translations == ["One", "Two"]
+        assert client.models.generate_content_stream.call_count == 2
+        assert (temp_dir / "L0002" / "en.txt").read_text(encoding="utf-8") == "Two\n"
+
+    def test_failed_batch_falls_back_to_single_requests(self, temp_dir):
+        """Test that a batch request error translates every letter one by one."""
+        make_letters(temp_dir, ["Eins", "Zwei"])
+        batch = [(str(temp_dir / "L0001"), "Eins", None), (str(temp_dir / "L0002"), "Zwei", None)]
+        client = make_stream_client(ValueError("bad request"), "One", "Two")
+
+        translations = _translate_batch(batch, Namespace(latex=False), client)
+
+        assert translations == ["One", "Two"]
+        assert client.models.generate_content_stream.call_count == 3
+
+
+# ============================================================================
+# TESTS: _stream_text() retries
+# ============================================================================
+
+@pytest.mark.unit
+@pytest.mark.letters
+class TestStreamRetry:
+    """Tests for retrying transient Gemini errors."""
+
+    @patch("translate_letters.time.sleep")
+    def test_retries_transient_error(self, mock_sleep):
+        """Test that a 503 is retried and the next reply is returned."""
+        overloaded = errors.ServerError(503, {"error": {"code": 503, "message": "overloaded"}})
+        client = make_stream_client(overloaded, "Hello")
+
+        assert translate_letters.translate_letter("Hallo", client) == "Hello"
+        assert client.models.generate_content_stream.call_count == 2
+        mock_sleep.assert_called_once()
+
+    @patch("translate_letters.time.sleep")
+    def test_gives_up_after_max_attempts(self, mock_sleep):
+        """Test that the last transient error is raised once attempts run out."""
+        overloaded = errors.ServerError(503, {"error": {"code": 503, "message": "overloaded"}})
+        client = make_stream_client(*[overloaded] * translate_letters.TRANSLATE_RETRY_ATTEMPTS)
+
+        with pytest.raises(errors.ServerError):
+            translate_letters.translate_letter("Hallo", client)
+        assert mock_sleep.call_count == translate_letters.TRANSLATE_RETRY_ATTEMPTS - 1
+
+    @patch("translate_letters.time.sleep")
+    def test_does_not_retry_other_errors(self, mock_sleep):
+        """Test that a non-transient error is raised immediately."""
+        client = make_stream_client(ValueError("bad request"))
+
+        with pytest.raises(ValueError):
+            translate_letters.translate_letter("Hallo", client)
+        mock_sleep.assert_not_called()
+
+
+# ============================================================================
+# TESTS: main()
+# ============================================================================
+
+@pytest.mark.unit
+@pytest.mark.letters
+class TestMain:
+    """Tests for deduplication and caching in the translate workflow."""
+
+    def test_identical_letters_translated_once(self, temp_dir, mock_env_with_api_key):
+        """Test that byte-identical letters share one request."""
+        make_letters(temp_dir, ["Gleich", "Gleich", "Anders"])
+        client = Mock()
+        client.models.generate_content_stream.side_effect = lambda **kwargs: [
+            SimpleNamespace(text="EN " + kwargs["contents"][0].parts[1].text.split("\n")[0])
+        ]
+
+        main(["--letters-dir", str(temp_dir), "--concurrency", "1"], client=client)
+
+        assert client.models.generate_content_stream.call_count == 2
+        first = (temp_dir / "L0001" / "en.txt").read_text(encoding="utf-8")
+        assert first == "EN Gleich\n"
+        assert (temp_dir / "L0002" / "en.txt").read_text(encoding="utf-8") == first
+        assert (temp_dir / "L0003" / "en.txt").read_text(encoding="utf-8") == "EN Anders\n"
+
+    def test_cache_serves_repeat_run(self, temp_dir, mock_env_with_api_key):
+        """Test that a forced re-run takes unchanged letters from the cache."""
+        letters_dir = temp_dir / "letters"
+        make_letters(letters_dir, ["Hallo"])
+        argv = ["--letters-dir", str(letters_dir), "--cache-dir", str(temp_dir / "cache")]
+        client = make_stream_client("Hello")
+
+        main(argv, client=client)
+        (letters_dir / "L0001" / "en.txt").unlink()
+        main(argv + ["--force"], client=client)
+
+        assert client.models.generate_content_stream.call_count == 1
+        assert (letters_dir / "L0001" / "en.txt").read_text(encoding="utf-8") == "Hello\n"
+        assert list((temp_dir / "cache").rglob("*.txt"))
@@ -9,6 +9,10 @@ Outputs (per letter)
 - en.txt          (plain English translation)
 - en.tex (opt)    (deterministic LaTeX of the English text; no LLM)
 
+Caching (opt)
+- --cache-dir keeps translations keyed by sha256(prompt version | model | source text),
+  so re-runs only call Gemini for letters whose text, model, or prompt changed.
+
 Notes
 - No narrative or analysis; strict one-to-one letter translation.
 - The prompt forbids headings/numbering/commentary. Output is plain text only.
@@ -17,18 +21,35 @@ from __future__ import annotations
 
 import os
 import sys
+import re
+import hashlib
 import argparse
-from typing import List
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
-from dotenv import load_dotenv
-from google import genai
+import _env  # noqa: F401  (loads .env once)
+from _common import get_client
 from google.genai import types
 
 
+# _env has loaded .env by now and the model is fixed for the process, so the
+# environment is read once instead of on every request
+@functools.lru_cache(maxsize=1)
 def current_model() -> str:
     return os.environ.get("GEMINI_MODEL", "gemini-3-flash-preview")
 
 
+# Upper bound on letters translated at once, whatever the configured concurrency
+TRANSLATE_MAX_WORKERS = 32
+
+# Bump whenever PROMPT_TRANSLATE changes so cached translations are not reused
+PROMPT_VERSION = "1"
+
+
 PROMPT_TRANSLATE = (
     "Translate the following House Oversight Committee document page(s) to natural, idiomatic English.\n"
     "Preserve meaning, dates, names, and paragraph breaks.\n"
@@ -40,129 +61,456 @@ PROMPT_TRANSLATE = (
 )
 
 
-def list_letter_dirs(letters_dir: str) -> List[str]:
-    if not os.path.isdir(letters_dir):
+# Source characters sent per single-letter request; longer letters are split at
+# paragraph boundaries so each reply fits the 8192-token output cap
+MAX_INPUT_CHARS = 24_000
+
+# Batched requests: letters are packed up to BATCH_MAX_CHARS of source text and
+# separated by boundary lines the model must repeat before each translation
+BATCH_MAX_CHARS = 24_000
+BATCH_MAX_OUTPUT_TOKENS = 16384
+_BOUNDARY = "<<<DOC_BOUNDARY id={n}>>>"
+_BOUNDARY_RE = re.compile(r"^<<<DOC_BOUNDARY id=(\d+)>>>[ \t]*$", re.MULTILINE)
+
+PROMPT_TRANSLATE_BATCH = (
+    "Translate each of the following House Oversight Committee documents to natural, idiomatic English.\n"
+    "Preserve meaning, dates, names, and paragraph breaks.\n"
+    "Do not add headings, numbering, labels, or commentary.\n"
+    "Each document starts with a line of the form <<<DOC_BOUNDARY id=N>>>. Copy that line unchanged, "
+    "on its own line, before each translation, and keep the documents in the same order.\n"
+    "Output only the boundary lines and the translated text.\n\n"
+    "--- BEGIN SOURCE DOCUMENTS ---\n"
+    "{documents}\n"
+    "--- END SOURCE DOCUMENTS ---"
+)
+
+
+def _scan_letter_dirs(letters_dir: str) -> List[Tuple[str, str, bool]]:
+    """Return (letter dir, source text path, has en.txt) for every letter, sorted.
+    
+    Each letter directory is listed once; the listing answers which source file
+    it has and whether it is already translated, with no per-file stat().
+    """
+    letters: List[Tuple[str, str, bool]] = []
+    try:
+        with os.scandir(letters_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    with os.scandir(entry.path) as files:
+                        names = {f.name for f in files if f.is_file()}
+                except OSError:
+                    continue
+                # Accept both legacy "L0001" and new "<Collection> L0001" directories
+                source = "de.txt" if "de.txt" in names else "text.txt" if "text.txt" in names else None
+                if source:
+                    letters.append((entry.path, os.path.join(entry.path, source), "en.txt" in names))
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    dirs: List[str] = []
-    for name in os.listdir(letters_dir):
-        path = os.path.join(letters_dir, name)
-        if not os.path.isdir(path):
-            continue
-        # Accept both legacy "L0001" and new "<Collection> L0001" directories
-        if os.path.isfile(os.path.join(path, "de.txt")) or os.path.isfile(os.path.join(path, "text.txt")):
-            dirs.append(path)
-    dirs.sort()
-    return dirs
+    letters.sort()
+    return letters
+
+
+def list_letter_dirs(letters_dir: str) -> List[str]:
+    return [ldir for ldir, _, _ in _scan_letter_dirs(letters_dir)]
+
+
+# One pass over the text; mapping every special character at once also keeps the
+# braces of \textbackslash{} from being escaped again
+_LATEX_ESCAPES = str.maketrans({
+    "\\": r"\textbackslash{}",
+    "{": r"\{",
+    "}": r"\}",
+    "$": r"\$",
+    "#": r"\#",
+    "&": r"\&",
+    "%": r"\%",
+    "_": r"\_",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+})
+
+
+# Everything ahead of the title is the same for every letter
+_LATEX_PREAMBLE = (
+    "\\documentclass[12pt]{article}\n"
+    "\\usepackage[utf8]{inputenc}\n"
+    "\\usepackage[T1]{fontenc}\n"
+    "\\usepackage[english]{babel}\n"
+    "\\usepackage{geometry}\n\\geometry{margin=1in}\n"
+    "\\usepackage{parskip}\n"
+    "\\begin{document}\n"
+    "\\section*{"
+)
 
 
 def to_latex_document(title: str, body_text: str) -> str:
-    def esc(s: str) -> str:
-        repl = {
-            "\\": r"\textbackslash{}",
-            "{": r"\{",
-            "}": r"\}",
-            "$": r"\$",
-            "#": r"\#",
-            "&": r"\&",
-            "%": r"\%",
-            "_": r"\_",
-            "~": r"\textasciitilde{}",
-            "^": r"\textasciicircum{}",
-        }
-        for k, v in repl.items():
-            s = s.replace(k, v)
-        return s
-
-    return (
-        "\\documentclass[12pt]{article}\n"
-        "\\usepackage[utf8]{inputenc}\n"
-        "\\usepackage[T1]{fontenc}\n"
-        "\\usepackage[english]{babel}\n"
-        "\\usepackage{geometry}\n\\geometry{margin=1in}\n"
-        "\\usepackage{parskip}\n"
-        "\\begin{document}\n"
-        f"\\section*{{{esc(title)}}}\n"
-        "\\noindent\n"
-        f"{esc(body_text)}\n"
-        "\\end{document}\n"
-    )
+    return "".join((
+        _LATEX_PREAMBLE,
+        title.translate(_LATEX_ESCAPES),
+        "}\n\\noindent\n",
+        body_text.translate(_LATEX_ESCAPES),
+        "\n\\end{document}\n",
+    ))
 
 
-def translate_letter(german_text: str, client) -> str:
-    prompt = PROMPT_TRANSLATE.format(german=german_text)
-    contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
-    cfg = types.GenerateContentConfig(
+def _split_template(template: str, field: str) -> Tuple[types.Part, str]:
+    """Split a one-field prompt template into its constant leading Part and its tail."""
+    head, tail = template.split("{" + field + "}")
+    return types.Part.from_text(text=head), tail
+
+
+# The instructions ahead of the source text never change, so they are built once
+# and sent as a byte-identical leading part that Gemini's prefix cache can reuse
+_TRANSLATE_HEAD_PART, _TRANSLATE_TAIL = _split_template(PROMPT_TRANSLATE, "german")
+_TRANSLATE_BATCH_HEAD_PART, _TRANSLATE_BATCH_TAIL = _split_template(PROMPT_TRANSLATE_BATCH, "documents")
+
+
+# Thinking tokens scale with the source text: one per THINKING_DIVISOR characters,
+# clamped to [THINKING_MIN, THINKING_MAX]; translation needs little reasoning
+THINKING_DIVISOR = max(1, int(os.environ.get("TRANSLATE_THINKING_DIVISOR") or 20))
+THINKING_MIN = 64
+THINKING_MAX = 1024
+
+
+def _thinking_budget(source_chars: int) -> int:
+    return max(THINKING_MIN, min(THINKING_MAX, source_chars // THINKING_DIVISOR))
+
+
+# Built once per (output cap, budget) pair and shared by every request that uses it
+@functools.lru_cache(maxsize=None)
+def _generation_config(max_output_tokens: int, thinking_budget: int) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
         temperature=0.6,
         top_p=0.8,
         response_mime_type="text/plain",
-        max_output_tokens=8192,
-        thinking_config=types.ThinkingConfig(thinking_budget=512),
+        max_output_tokens=max_output_tokens,
+        thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+    )
+
+
+# Requests failing with a transient status are retried with exponential backoff
+# and full jitter (or the server's Retry-After) instead of dropping the letter
+TRANSLATE_RETRY_ATTEMPTS = 6
+TRANSLATE_RETRY_BASE_SECONDS = 1.0
+TRANSLATE_RETRY_MAX_SECONDS = 30.0
+_TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _retry_delay(attempt: int, exc: Exception) -> float:
+    """Seconds to wait before retrying after the given 1-based attempt failed with exc."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers:
+        try:
+            return min(TRANSLATE_RETRY_MAX_SECONDS, float(headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    cap = min(TRANSLATE_RETRY_MAX_SECONDS, TRANSLATE_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, cap)
+
+
+def _stream_text(prompt_parts: List[types.Part], client, cfg: types.GenerateContentConfig) -> str:
+    contents = [types.Content(role="user", parts=prompt_parts)]
+    attempt = 1
+    while True:
+        parts: List[str] = []
+        try:
+            for chunk in client.models.generate_content_stream(
+                model=current_model(),
+                contents=contents,
+                config=cfg,
+            ):
+                if chunk.text:
+                    parts.append(chunk.text)
+            return "".join(parts).strip()
+        except Exception as exc:
+            # A partial reply is discarded; the whole request is sent again
+            if attempt == TRANSLATE_RETRY_ATTEMPTS or getattr(exc, "code", None) not in _TRANSIENT_STATUS_CODES:
+                raise
+            delay = _retry_delay(attempt, exc)
+            print(f"  Transient error ({exc}); retrying in {delay:.1f}s", file=sys.stderr)
+            time.sleep(delay)
+            attempt += 1
+
+
+# Where an oversized paragraph may be cut: after a sentence end or at a line break,
+# else between words; a hard cut mid-word is the last resort
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.?!])\s+|\n\s*")
+_WORD_BREAK_RE = re.compile(r"\s+")
+
+
+def _cut_paragraph(paragraph: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Cut a paragraph into pieces of at most max_chars at the last break before the limit.
+    
+    Returns (piece, joiner) pairs: " " after a sentence or word break, "" after a hard cut.
+    """
+    pieces: List[Tuple[str, str]] = []
+    joiner = ""
+    while len(paragraph) > max_chars:
+        cut = rest = max_chars
+        next_joiner = ""
+        for pattern in (_SENTENCE_BREAK_RE, _WORD_BREAK_RE):
+            last = None
+            for last in pattern.finditer(paragraph, 1, max_chars + 1):
+                pass
+            if last is not None:
+                cut, rest, next_joiner = last.start(), last.end(), " "
+                break
+        pieces.append((paragraph[:cut], joiner))
+        paragraph, joiner = paragraph[rest:], next_joiner
+    if paragraph:
+        pieces.append((paragraph, joiner))
+    return pieces
+
+
+def _split_windows(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Greedily pack paragraphs into windows of at most max_chars.
+    
+    Returns (window, joiner) pairs; joiner goes in front of the window's translation
+    when they are rejoined: "" for the first window, "\n\n" at a paragraph break and
+    " " (or "" after a hard cut) where an oversized paragraph was cut (see _cut_paragraph).
+    """
+    windows: List[Tuple[str, str]] = []
+    current: List[str] = []
+    joiner = "\n\n"
+    size = 0
+    for paragraph in text.split("\n\n"):
+        pieces = _cut_paragraph(paragraph, max_chars) if len(paragraph) > max_chars else [(paragraph, "")]
+        for n, (piece, piece_joiner) in enumerate(pieces):
+            # A continuation always starts a window, since paragraphs inside a window
+            # are rejoined with a blank line (+2 below)
+            if current and (n > 0 or size + 2 + len(piece) > max_chars):
+                windows.append(("\n\n".join(current), joiner))
+                current, size = [], 0
+            if not current:
+                joiner = piece_joiner if n > 0 else "\n\n"
+            size += len(piece) + (2 if current else 0)
+            current.append(piece)
+    if current:
+        windows.append(("\n\n".join(current), joiner))
+    # Blank paragraphs (runs of empty lines, leading/trailing breaks) can leave a
+    # window with nothing to translate; never send one of those
+    windows = [(window, sep) for window, sep in windows if window.strip()]
+    if windows:
+        windows[0] = (windows[0][0], "")
+    return windows
+
+
+def translate_letter(german_text: str, client) -> str:
+    # Long letters are translated in paragraph windows so no reply can run into
+    # max_output_tokens and come back truncated
+    if len(german_text) > MAX_INPUT_CHARS:
+        return "".join(
+            joiner + translate_letter(window, client)
+            for window, joiner in _split_windows(german_text, MAX_INPUT_CHARS)
+        )
+    return _stream_text(
+        [_TRANSLATE_HEAD_PART, types.Part.from_text(text=german_text + _TRANSLATE_TAIL)],
+        client,
+        _generation_config(8192, _thinking_budget(len(german_text))),
     )
-    out = ""
-    for chunk in client.models.generate_content_stream(
-        model=current_model(),
-        contents=contents,
-        config=cfg,
-    ):
-        if chunk.text:
-            out += chunk.text
-    return out.strip()
-
-
-def main() -> None:
-    load_dotenv()
+
+
+def batch_translate(items: List[Tuple[str, str]], client) -> Dict[str, str]:
+    """Translate several (key, text) letters in one request.
+    
+    Letters are sent between numbered boundary lines that the model repeats in
+    its output. Returns translations by key; letters whose section is missing or
+    empty in the reply are left out so the caller can translate them singly.
+    """
+    documents = "\n\n".join(
+        f"{_BOUNDARY.format(n=n)}\n{text}" for n, (_, text) in enumerate(items, 1)
+    )
+    out = _stream_text(
+        [_TRANSLATE_BATCH_HEAD_PART, types.Part.from_text(text=documents + _TRANSLATE_BATCH_TAIL)],
+        client,
+        _generation_config(BATCH_MAX_OUTPUT_TOKENS, _thinking_budget(len(documents))),
+    )
+    # re.split yields [preamble, n1, text1, n2, text2, ...]
+    pieces = _BOUNDARY_RE.split(out)
+    sections: Dict[int, str] = {}
+    for n, text in zip(pieces[1::2], pieces[2::2]):
+        sections.setdefault(int(n), text.strip())
+    results: Dict[str, str] = {}
+    for n, (key, _) in enumerate(items, 1):
+        if sections.get(n):
+            results[key] = sections[n]
+    return results
+
+
+def translation_cache_path(cache_dir: str, german_text: str) -> str:
+    key = hashlib.sha256(f"{PROMPT_VERSION}|{current_model()}|{german_text}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, key[:2], f"{key}.txt")
+
+
+def _prepare_dir(
+    letter: Tuple[str, str, bool], args: argparse.Namespace
+) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Finish skipped, empty and cached letters; return (ldir, text, cache path) for the rest."""
+    ldir, de_path, has_en = letter
+    en_path = os.path.join(ldir, "en.txt")
+    if has_en and not args.force:
+        print(f"Skip existing: {en_path}")
+        return None
+
+    with open(de_path, "r", encoding="utf-8") as f:
+        german = f.read().strip()
+    if not german:
+        with open(en_path, "w", encoding="utf-8") as f:
+            f.write("")
+        return None
+
+    cache_path = translation_cache_path(args.cache_dir, german) if args.cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        print(f"Cached translation: {ldir}")
+        with open(cache_path, "r", encoding="utf-8") as f:
+            _write_translation(ldir, f.read(), args)
+        return None
+    return ldir, german, cache_path
+
+
+def _write_translation(ldir: str, english: str, args: argparse.Namespace) -> None:
+    with open(os.path.join(ldir, "en.txt"), "w", encoding="utf-8") as f:
+        f.write(english + "\n")
+
+    if args.latex:
+        en_tex = to_latex_document(title=f"{os.path.basename(ldir)} (English)", body_text=english)
+        with open(os.path.join(ldir, "en.tex"), "w", encoding="utf-8") as f:
+            f.write(en_tex)
+
+
+def _finish_translation(item: Tuple[str, str, Optional[str]], english: str, args: argparse.Namespace) -> None:
+    ldir, _, cache_path = item
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Letters with the same text may finish together; replace atomically
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(english)
+        os.replace(tmp_path, cache_path)
+    _write_translation(ldir, english, args)
+
+
+def _translate_one(item: Tuple[str, str, Optional[str]], args: argparse.Namespace, client) -> Optional[str]:
+    """Translate and write one letter; return the translation, or None on error."""
+    ldir, german, _ = item
+    print(f"Translating {ldir} ({len(german)} chars)")
+    try:
+        english = translate_letter(german, client)
+    except Exception as e:
+        print(f"  Translation error ({ldir}): {e}", file=sys.stderr)
+        return None
+    _finish_translation(item, english, args)
+    return english
+
+
+def _translate_batch(
+    batch: List[Tuple[str, str, Optional[str]]], args: argparse.Namespace, client
+) -> List[Optional[str]]:
+    """Translate a packed batch in one request; letters it misses are retried singly.
+    
+    Returns the translations in batch order (None where a letter failed).
+    """
+    if len(batch) == 1:
+        return [_translate_one(batch[0], args, client)]
+    print(f"Translating {len(batch)} letters in one request ({batch[0][0]} ...)")
+    try:
+        results = batch_translate([(ldir, german) for ldir, german, _ in batch], client)
+    except Exception as e:
+        print(f"  Batch translation error: {e}; translating letters one by one", file=sys.stderr)
+        results = {}
+    translations: List[Optional[str]] = []
+    for item in batch:
+        english = results.get(item[0])
+        if english is None:
+            english = _translate_one(item, args, client)
+        else:
+            _finish_translation(item, english, args)
+        translations.append(english)
+    return translations
+
+
+def _pack_batches(
+    items: List[Tuple[str, str, Optional[str]]], max_chars: int
+) -> List[List[Tuple[str, str, Optional[str]]]]:
+    """Greedily group letters, in order, until a batch would exceed max_chars of source text."""
+    batches: List[List[Tuple[str, str, Optional[str]]]] = []
+    size = 0
+    for item in items:
+        if not batches or size + len(item[1]) > max_chars:
+            batches.append([])
+            size = 0
+        batches[-1].append(item)
+        size += len(item[1])
+    return batches
+
+
+def _translate_concurrency(concurrency: Optional[int]) -> int:
+    """Resolve the worker count: explicit value, then TRANSLATE_CONCURRENCY, then GEMINI_PARALLEL, else 8."""
+    if concurrency is None:
+        concurrency = int(os.environ.get("TRANSLATE_CONCURRENCY") or os.environ.get("GEMINI_PARALLEL") or 8)
+    return max(1, min(TRANSLATE_MAX_WORKERS, concurrency))
+
+
+def main(argv: Optional[List[str]] = None, client=None) -> None:
     ap = argparse.ArgumentParser(description="Translate grouped letters/stories to English")
     ap.add_argument("--letters-dir", default="letters")
     ap.add_argument("--latex", action="store_true")
     ap.add_argument("--force", action="store_true", help="Overwrite existing en.txt")
-    args = ap.parse_args()
+    ap.add_argument("--cache-dir", help="Directory for the prompt/model/text-keyed translation cache (optional)")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        help="Letters translated in parallel (default: $TRANSLATE_CONCURRENCY, $GEMINI_PARALLEL or 8)",
+    )
+    ap.add_argument(
+        "--batch",
+        action="store_true",
+        help=f"Pack several short letters (up to {BATCH_MAX_CHARS} source chars) into each request",
+    )
+    args = ap.parse_args(argv)
 
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         print("GEMINI_API_KEY not set", file=sys.stderr)
         sys.exit(1)
 
-    client = genai.Client(api_key=api_key)
+    if client is None:
+        client = get_client(api_key)
 
-    letter_dirs = list_letter_dirs(args.letters_dir)
+    letter_dirs = _scan_letter_dirs(args.letters_dir)
     if not letter_dirs:
         print(f"No letter directories found in {args.letters_dir}")
         return
 
-    for ldir in letter_dirs:
-        de_path = os.path.join(ldir, "de.txt")
-        if not os.path.exists(de_path):
-            alt_path = os.path.join(ldir, "text.txt")
-            if os.path.exists(alt_path):
-                de_path = alt_path
-        en_path = os.path.join(ldir, "en.txt")
-        if not os.path.exists(de_path):
-            continue
-        if os.path.exists(en_path) and not args.force:
-            print(f"Skip existing: {en_path}")
-            continue
-
-        with open(de_path, "r", encoding="utf-8") as f:
-            german = f.read().strip()
-        if not german:
-            with open(en_path, "w", encoding="utf-8") as f:
-                f.write("")
-            continue
-
-        print(f"Translating {ldir} ({len(german)} chars)")
-        try:
-            english = translate_letter(german, client)
-        except Exception as e:
-            print(f"  Translation error: {e}", file=sys.stderr)
+    # Each request is network-bound on Gemini, so overlap them in threads;
+    # the pool size is also the cap on requests in flight
+    max_workers = min(_translate_concurrency(args.concurrency), len(letter_dirs))
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        pending = [item for item in ex.map(lambda letter: _prepare_dir(letter, args), letter_dirs) if item]
+        # Byte-identical letters (the same page filed in several collections) are
+        # translated once; the other letters of the group get copies afterwards
+        groups: Dict[str, List[Tuple[str, str, Optional[str]]]] = {}
+        for item in pending:
+            groups.setdefault(item[1], []).append(item)
+        unique = [members[0] for members in groups.values()]
+        if args.batch:
+            batches = _pack_batches(unique, BATCH_MAX_CHARS)
+            translations = [
+                english
+                for done in ex.map(lambda batch: _translate_batch(batch, args, client), batches)
+                for english in done
+            ]
+        else:
+            translations = list(ex.map(lambda item: _translate_one(item, args, client), unique))
+    
+    for (ldir, german, _), english in zip(unique, translations):
+        if english is None:
             continue
-
-        with open(en_path, "w", encoding="utf-8") as f:
-            f.write(english + "\n")
-
-        if args.latex:
-            en_tex = to_latex_document(title=f"{os.path.basename(ldir)} (English)", body_text=english)
-            with open(os.path.join(ldir, "en.tex"), "w", encoding="utf-8") as f:
-                f.write(en_tex)
+        for copy_dir, _, _ in groups[german][1:]:
+            print(f"Same text as {ldir}: {copy_dir}")
+            _write_translation(copy_dir, english, args)
 
     print("Done.")
 
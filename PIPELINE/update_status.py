@@ -8,14 +8,54 @@ with the timestamp of the most recent git commit.
 from __future__ import annotations
 
 import os
+import re
 import sys
 import subprocess
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+try:
+    import pygit2
+except ImportError:  # optional speedup; get_last_commit_time falls back to the git CLI
+    pygit2 = None
+
+# Timestamp patterns rewritten in the READMEs, compiled once. They match the raw
+# UTF-8 bytes, so a README is never decoded and re-encoded. Order matters: the
+# corrupted "P25-" form is repaired into a "**Last Update:**" line first.
+_CORRUPTED_P25_RE = re.compile(rb'P25-\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+# **Last Update:** followed by timestamp (with or without UTC)
+_LAST_UPDATE_RE = re.compile(rb'(\*\*Last Update:\*\*\s*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\s*(?:UTC)?\s*\n)')
+# "last update was **timestamp**"
+_LAST_UPDATE_WAS_RE = re.compile(
+    rb'(last update was \*\*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\s*(?:UTC)?\s*\*\*)', re.IGNORECASE
+)
+# More flexible pattern - any timestamp after "Last Update:"
+_LAST_UPDATE_ANY_RE = re.compile(rb'(\*\*Last Update:\*\*\s*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(.*?\n)')
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+_PLACEHOLDER = b'{LAST_GIT_COMMIT_TIME}'
+
+
+def _last_commit_time_pygit2(base_dir: Path) -> str | None:
+    """Read the HEAD commit time through libgit2, or None when that is not possible."""
+    try:
+        repo_path = pygit2.discover_repository(str(base_dir))
+        if repo_path is None:
+            return None
+        commit = pygit2.Repository(repo_path).head.peel(pygit2.Commit)
+    except (pygit2.GitError, KeyError, ValueError):
+        return None
+    # Committer's local time, as `git log --format=%ci` prints it
+    tz = timezone(timedelta(minutes=commit.commit_time_offset))
+    return datetime.fromtimestamp(commit.commit_time, tz).strftime("%Y-%m-%d %H:%M:%S")
 
 
 def get_last_commit_time(base_dir: Path) -> str:
     """Get the timestamp of the last git commit."""
+    if pygit2 is not None:
+        commit_time = _last_commit_time_pygit2(base_dir)
+        if commit_time is not None:
+            return commit_time
     try:
         result = subprocess.run(
             ["git", "log", "-1", "--format=%ci"],
@@ -57,54 +97,37 @@ def update_readme(base_dir: Path) -> bool:
         # Read README - use binary mode to avoid encoding issues
         try:
             with open(readme_path, 'rb') as f:
-                content_bytes = f.read()
-                # Remove BOM if present
-                if content_bytes.startswith(b'\xef\xbb\xbf'):
-                    content_bytes = content_bytes[3:]
-                content = content_bytes.decode('utf-8')
+                content = f.read()
         except Exception as e:
             print(f"Error reading {readme_path}: {e}", file=sys.stderr)
             continue
+        # Remove BOM if present; the file is written back without one
+        if content.startswith(_UTF8_BOM):
+            content = content[len(_UTF8_BOM):]
         
         # Replace placeholder OR hardcoded timestamp
         original_content = content
+        stamp_bytes = last_commit_time.encode('utf-8')
         
         # Replace placeholder if it exists
-        if "{LAST_GIT_COMMIT_TIME}" in content:
-            content = content.replace("{LAST_GIT_COMMIT_TIME}", last_commit_time)
-        
-        # Also replace any hardcoded timestamp pattern OR corrupted "P25" pattern
-        import re
-        
-        # Fix corrupted "P25" pattern first (encoding issue)
-        if 'P25-' in content:
-            content = re.sub(r'P25-\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', '**Last Update:** ' + last_commit_time, content)
-        
-        # Pattern to match: **Last Update:** followed by timestamp (with or without UTC)
-        pattern = r'(\*\*Last Update:\*\*\s*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\s*(?:UTC)?\s*\n)'
-        if re.search(pattern, content):
-            content = re.sub(pattern, r'\1' + last_commit_time + r'\2', content)
-        
-        # Pattern for "last update was **timestamp**"
-        pattern2 = r'(last update was \*\*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\s*(?:UTC)?\s*\*\*)'
-        if re.search(pattern2, content, re.IGNORECASE):
-            content = re.sub(pattern2, r'\1' + last_commit_time + r'\2', content, flags=re.IGNORECASE)
+        content = content.replace(_PLACEHOLDER, stamp_bytes)
         
-        # More flexible pattern - any timestamp after "Last Update:"
-        pattern3 = r'(\*\*Last Update:\*\*\s*)\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(.*?\n)'
-        if re.search(pattern3, content):
-            content = re.sub(pattern3, r'\1' + last_commit_time + r'\2', content)
+        # Also replace any hardcoded timestamp pattern OR corrupted "P25" pattern;
+        # sub() is a no-op without a match, so no separate search() pass is needed
+        content = _CORRUPTED_P25_RE.sub(b'**Last Update:** ' + stamp_bytes, content)
+        stamp = rb'\g<1>' + stamp_bytes + rb'\g<2>'
+        for pattern in (_LAST_UPDATE_RE, _LAST_UPDATE_WAS_RE, _LAST_UPDATE_ANY_RE):
+            content = pattern.sub(stamp, content)
         
         # Only write if changed
         if content != original_content:
+            # Write a sibling temp file and swap it in, so an interrupted run
+            # never leaves a truncated README behind
+            tmp_path = readme_path.with_suffix('.md.tmp')
             try:
-                # Write with UTF-8 encoding without BOM - use binary mode to avoid encoding issues
-                content_bytes = content.encode('utf-8')
-                # Remove BOM if present
-                if content_bytes.startswith(b'\xef\xbb\xbf'):
-                    content_bytes = content_bytes[3:]
-                with open(readme_path, 'wb') as f:
-                    f.write(content_bytes)
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, readme_path)
                 print(f"Updated {readme_path.name} with last commit time: {last_commit_time}")
                 updated_count += 1
             except Exception as e: